@@ -0,0 +1,235 @@
+"""Нагрузочные сценарии редактора без терминала.
+
+VimController и CursesView работают как обычно, но ввод и вывод идут через ScriptedAdapter.
+Каждый сценарий прогоняется три раза на свежей копии редактора:
+  - по одной клавише за кадр - задержка каждой клавиши (перцентили);
+  - все клавиши сразу - сколько кадров и времени уходит на пачку ввода;
+  - все клавиши сразу под tracemalloc - пик и прирост памяти.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench
+    python -m benchmarks.bench --lines 3000000 --scenario search --json result.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.scripted_adapter import ScriptedAdapter
+from controller.controller import VimController, PAGE_UP, PAGE_DOWN
+from interfaces.IControllerAdapter import KEY_PASTE
+from model.model import Model
+from view import CursesView
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ESC = 27
+ENTER = 10
+PERCENTILES = (50, 90, 99)
+
+# Сценарий: клавиши и тексты вставок для KEY_PASTE
+Script = Tuple[List[int], List[str]]
+
+
+def keys(text: str) -> List[int]:
+    return [ord(char) for char in text]
+
+
+def typing(count: int = 2000) -> Script:
+    """Набор текста с переводами строк и исправлениями"""
+    text = []
+    for i in range(count):
+        if i % 60 == 59:
+            text.append(ENTER)
+        elif i % 17 == 16:
+            text.append(8)
+        else:
+            text.append(ord("abcdefghij klmnopqrstuvwxyz"[i % 27]))
+    return keys("ggi") + text + [ESC], []
+
+
+def paste(size: int = 1 << 20) -> Script:
+    """Одна вставка из буфера обмена терминала размером size символов"""
+    line = "pasted line of text with some words in it\n"
+    block = line * (size // len(line) + 1)
+    return keys("ggi") + [KEY_PASTE, ESC], [block[:size]]
+
+
+def dd_storm(count: int = 500) -> Script:
+    """Удаление строк подряд из середины файла"""
+    return keys("gg") + [PAGE_DOWN] * 3 + keys("dd") * count, []
+
+
+def search(pattern: str, count: int = 200) -> Script:
+    """Поиск и переходы n/N по совпадениям"""
+    return keys("/" + pattern) + [ENTER] + keys("n") * count + keys("N") * (count // 4) + [ESC], []
+
+
+def jumps(count: int = 100) -> Script:
+    """Прыжки в конец и начало файла"""
+    return keys("Ggg") * count, []
+
+
+def paging(count: int = 200) -> Script:
+    """Листание страницами вниз и обратно"""
+    return [PAGE_DOWN] * count + [PAGE_UP] * count, []
+
+
+def scenarios(pattern: str) -> Dict[str, Callable[[], Script]]:
+    return {
+        "typing": typing,
+        "paste": paste,
+        "dd": dd_storm,
+        "search": lambda: search(pattern),
+        "jumps": jumps,
+        "paging": paging,
+    }
+
+
+def generate(path: str, lines: int) -> None:
+    """Пишет лог-подобный файл из lines строк"""
+    with open(path, "w", encoding="utf-8") as f:
+        chunk = []
+        for i in range(lines):
+            chunk.append(f"{i:09d} worker-{i % 16:02d} Hello World {i % 7} request took {i % 997} ms\n")
+            if len(chunk) == 10000:
+                f.writelines(chunk)
+                chunk = []
+        f.writelines(chunk)
+
+
+class Editor:
+    """Редактор в сборе, как в main.py, но с ScriptedAdapter"""
+
+    def __init__(self, filename: str, rows: int, cols: int) -> None:
+        self.adapter = ScriptedAdapter(rows, cols)
+        self.model = Model()
+        self.view = CursesView(self.adapter)
+        for event in ("text_changed", "cursor_moved", "status_changed", "file_opened", "file_saved"):
+            self.model.add_observer(self.view, event)
+        self.controller = VimController(self.model, self.adapter)
+        self.model.load_file(filename)
+        self.model.set_status("normal")
+        self.adapter.reset_counters()
+
+    def per_key(self, script: Script) -> List[float]:
+        """Подает клавиши по одной, каждая в своем кадре; возвращает задержки в секундах"""
+        sequence, pastes = script
+        self.adapter.feed((), pastes)
+        latencies = []
+        for char in sequence:
+            self.adapter.feed((char,))
+            started = time.perf_counter()
+            self.controller.run_once(0)
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    def burst(self, script: Script) -> float:
+        """Подает все клавиши сразу, как при автоповторе или быстрой печати; возвращает общее время"""
+        sequence, pastes = script
+        self.adapter.feed(sequence, pastes)
+        started = time.perf_counter()
+        while self.adapter.pending():
+            self.controller.run_once(0)
+        return time.perf_counter() - started
+
+    def close(self) -> None:
+        """Штатное завершение, как при :q! - журналы правок удаляются"""
+        self.model.close()
+
+
+def percentile(values: List[float], percent: int) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_scenario(name: str, script: Script, filename: str, rows: int, cols: int) -> dict:
+    editor = Editor(filename, rows, cols)
+    latencies = editor.per_key(script)
+    per_key_frames = editor.adapter.frames
+    editor.close()
+    editor = Editor(filename, rows, cols)
+    burst_time = editor.burst(script)
+    burst_frames = editor.adapter.frames
+    editor.close()
+    editor = Editor(filename, rows, cols)
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    editor.burst(script)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    editor.close()
+    result = {
+        "scenario": name,
+        "file": os.path.basename(filename),
+        "keys": len(script[0]),
+        "frames": per_key_frames,
+        "burst_frames": burst_frames,
+        "burst_ms": burst_time * 1000,
+        "max_ms": max(latencies) * 1000 if latencies else 0.0,
+        "peak_kib": (peak - base) / 1024,
+        "net_kib": (current - base) / 1024,
+        "add_str": editor.adapter.add_str_calls,
+    }
+    for percent in PERCENTILES:
+        result[f"p{percent}_ms"] = percentile(latencies, percent) * 1000 if latencies else 0.0
+    return result
+
+
+COLUMNS = ("scenario", "file", "keys", "p50_ms", "p90_ms", "p99_ms", "max_ms",
+           "frames", "burst_frames", "burst_ms", "peak_kib", "net_kib")
+
+
+def print_table(results: List[dict]) -> None:
+    cells = [[f"{row[column]:.2f}" if isinstance(row[column], float) else str(row[column]) for column in COLUMNS]
+             for row in results]
+    widths = [max(len(column), *(len(line[i]) for line in cells)) for i, column in enumerate(COLUMNS)]
+    print("  ".join(column.rjust(width) for column, width in zip(COLUMNS, widths)))
+    for line in cells:
+        print("  ".join(cell.rjust(width) for cell, width in zip(line, widths)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замеры задержки ввода, памяти и кадров редактора")
+    parser.add_argument("--file", action="append", help="Файл для замеров (можно несколько раз)")
+    parser.add_argument("--lines", type=int, default=2000000,
+                        help="Размер сгенерированного файла в строках, 0 - не генерировать")
+    parser.add_argument("--scenario", action="append", help="Запустить только указанные сценарии")
+    parser.add_argument("--pattern", default="World 3", help="Образец для сценария search")
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--cols", type=int, default=160)
+    parser.add_argument("--json", help="Сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    available = scenarios(args.pattern)
+    names = args.scenario or list(available)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(unknown)}")
+
+    files = list(args.file or [os.path.join(ROOT, "large.txt")])
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.lines > 0:
+            generated = os.path.join(tmp, f"generated_{args.lines}.txt")
+            generate(generated, args.lines)
+            files.append(generated)
+        results = []
+        for filename in files:
+            for name in names:
+                results.append(run_scenario(name, available[name](), filename, args.rows, args.cols))
+                print(f"{name} on {os.path.basename(filename)}: done", file=sys.stderr)
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
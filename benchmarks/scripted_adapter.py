@@ -0,0 +1,91 @@
+from collections import deque
+from typing import Deque, Iterable, Optional, Tuple
+
+from interfaces.IControllerAdapter import IControllerAdapter, KEY_PASTE
+from interfaces.IViewAdapter import IViewAdapter
+from profiler import PROFILER
+
+
+class ScriptedAdapter(IControllerAdapter, IViewAdapter):
+    """Адаптер без терминала: клавиши берутся из сценария, вывод только подсчитывается"""
+
+    def __init__(self, rows: int = 50, cols: int = 160) -> None:
+        self.rows = rows
+        self.cols = cols
+        self._keys: Deque[int] = deque()
+        self._pastes: Deque[str] = deque()
+        self._paste = ""
+        self.frames = 0  # Число doupdate - реально выведенных кадров
+        self.add_str_calls = 0
+        self.cells = 0  # Сколько символов выведено на экран
+
+    def feed(self, keys: Iterable[int], pastes: Iterable[str] = ()) -> None:
+        """Добавляет клавиши в очередь; для каждого KEY_PASTE берется следующий текст из pastes"""
+        self._keys.extend(keys)
+        self._pastes.extend(pastes)
+
+    def pending(self) -> int:
+        return len(self._keys)
+
+    def reset_counters(self) -> None:
+        self.frames = 0
+        self.add_str_calls = 0
+        self.cells = 0
+
+    def init_curses(self) -> None:
+        pass
+
+    def get_screen_size(self) -> Tuple[int, int]:
+        return self.rows, self.cols
+
+    def clear_screen(self) -> None:
+        pass
+
+    def add_str(self, x: int, y: int, text: str, style: Optional[str] = None) -> None:
+        self.add_str_calls += 1
+        self.cells += len(text)
+
+    def clear_line(self, row: int) -> None:
+        pass
+
+    def move_cursor(self, x: int, y: int) -> None:
+        pass
+
+    def refresh(self) -> None:
+        self.frames += 1
+
+    def noutrefresh(self) -> None:
+        pass
+
+    def doupdate(self) -> None:
+        self.frames += 1
+
+    def _next(self) -> int:
+        if not self._keys:
+            return -1
+        char = self._keys.popleft()
+        if char == KEY_PASTE:
+            self._paste = self._pastes.popleft()
+        return char
+
+    def get_char(self) -> int:
+        return self._next()
+
+    def get_char_nowait(self) -> int:
+        return self._next()
+
+    def peek_char(self) -> int:
+        return self._keys[0] if self._keys else -1
+
+    def wait_char(self, timeout: float) -> int:
+        return self._next()
+
+    def get_paste(self) -> str:
+        return self._paste
+
+    def end_curses(self) -> None:
+        pass
+
+
+PROFILER.phase(ScriptedAdapter, "_next", "input")
+PROFILER.count(ScriptedAdapter, "add_str", "add_str")
@@ -2,8 +2,10 @@ import sys
 
 from curses_adapter import CursesAdapter
 from interfaces.IControllerAdapter import IControllerAdapter
+from model.follower import FOLLOW_MAX_LINES
 from model.model import IModel
 from my_string import my_string as MyString
+from profiler import PROFILER
 
 from interfaces.ICommandState import ICommandState
 
@@ -14,7 +16,6 @@ class CommandHandler(ICommandState):
         self._model = model
         self._buffer = MyString("")
         self._active = False
-        self._filename = ""
         #self._observers: List[CommandHandlerObserver] = []
 
     @property
@@ -33,11 +34,11 @@ class CommandHandler(ICommandState):
     def activate(self) -> None:
         self._active = True
         self._buffer = MyString("")
-        self._model.notify_observers("text_changed", "")
+        self._model.notify_observers("status_changed", "")
 
     def deactivate(self) -> None:
         self._active = False
-        self._model.notify_observers("text_changed", "")
+        self._model.notify_observers("status_changed", "")
 
     def handle_input(self, char: int) -> None:
         if char == 27:  # ESC
@@ -50,7 +51,7 @@ class CommandHandler(ICommandState):
             self._add_char(chr(char))
 
     def _add_char(self, char: str) -> None:
-        self._buffer = MyString(self.buffer + char)
+        self._buffer.append(char)
         self._model.set_command_buf(self._buffer.c_str())
         rows, cols = self._adapter.get_screen_size()
         self._adapter.move_cursor(rows - 1, len(self.buffer+char)+1)
@@ -60,12 +61,11 @@ class CommandHandler(ICommandState):
             # now_buffer = self._buffer.c_str()
             # if len(now_buffer) > 0:
             #     now_buffer = now_buffer[:-1]
-            now_len = self._buffer.size()
-            new_buffer = self._buffer.substr(0, now_len-1)
-            self._buffer = MyString(new_buffer)
+            self._buffer.split_off(self._buffer.size() - 1)
             self._model.set_command_buf(self._buffer.c_str())
 
     def _execute_command(self) -> None:
+        message = ""  # Ответ команды, остается в командной строке до следующей клавиши
         try:
             # Ручной парсинг команды
             buffer_str = self._buffer.c_str()
@@ -89,32 +89,92 @@ class CommandHandler(ICommandState):
                 return
 
             if cmd_parts[0] == 'w' and len(cmd_parts) > 1:
-                self._model.save_file(cmd_parts[1])
-                self._filename = cmd_parts[1]
+                self._model.save_file(cmd_parts[1], background=True, rename=True)
             elif cmd_parts[0] == 'o' and len(cmd_parts) > 1:
                 self._model.load_file(cmd_parts[1])
-                self._filename = cmd_parts[1]
+                self._model.set_filename(cmd_parts[1])
+                message = self._swap_warning()
+            elif cmd_parts[0] == 'e' and len(cmd_parts) > 1:
+                self._model.edit_file(cmd_parts[1])
+                message = self._swap_warning()
+            elif cmd_parts[0] == 'e!' and len(cmd_parts) == 1:
+                self._model.reload_file()
+            elif cmd_parts[0] == 'follow' and len(cmd_parts) == 2 and cmd_parts[1] == 'off':
+                self._model.unfollow()
+            elif cmd_parts[0] == 'follow' and len(cmd_parts) == 2 and not cmd_parts[1].isdigit():
+                message = "usage: follow [N | off]"
+            elif cmd_parts[0] == 'follow' and len(cmd_parts) <= 2:
+                self._model.follow(int(cmd_parts[1]) if len(cmd_parts) == 2 else FOLLOW_MAX_LINES)
+            elif cmd_parts[0] == 'recover' and len(cmd_parts) == 1:
+                if self._model.has_swap():
+                    self._model.recover()
+                    message = f"recovered {self._model.get_filename()}"
+                else:
+                    message = "no swap file to recover"
+            elif cmd_parts[0] == 'bn' and len(cmd_parts) == 1:
+                self._model.next_buffer()
+            elif cmd_parts[0] == 'bp' and len(cmd_parts) == 1:
+                self._model.prev_buffer()
+            elif cmd_parts[0] == 'ls' and len(cmd_parts) == 1:
+                message = self._buffer_list()
             elif cmd_parts[0] == 'q!' and len(cmd_parts) == 1:
+                self._model.close()
                 sys.exit(0)
             elif cmd_parts[0] == 'w' and len(cmd_parts) == 1:
-                if self._filename != "":
-                    self._model.save_file(self._filename)
+                if self._model.get_filename() != "":
+                    self._model.save_file(self._model.get_filename(), background=True)
+            elif cmd_parts[0] == 'w!' and len(cmd_parts) == 1:
+                if self._model.get_filename() != "":
+                    self._model.save_file(self._model.get_filename(), background=True, force=True)
             elif (cmd_parts[0] == 'wq!' or cmd_parts[0] == 'x') and len(cmd_parts) == 1:
-                if self._filename != "":
-                    self._model.save_file(self._filename)
+                if self._model.get_filename() != "":
+                    self._model.save_file(self._model.get_filename())
+                self._model.close()
                 sys.exit(0)
             elif cmd_parts[0] == 'q' and len(cmd_parts) == 1:
-                if not self._model.get_modify():
+                # Выход только если не изменен ни один из открытых документов
+                if not any(modified for _, _, modified, _ in self._model.list_buffers()):
+                    self._model.close()
                     sys.exit(0)
             elif cmd_parts[0] == 'number' and len(cmd_parts) > 1:
-                self._model.set_cursor_pos(0, int(cmd_parts[1])-1)
+                self._model.go_to_line(int(cmd_parts[1]))
+            elif cmd_parts[0].isdigit() and len(cmd_parts) == 1:
+                self._model.go_to_line(int(cmd_parts[0]))
+            elif cmd_parts[0] == 'noh' and len(cmd_parts) == 1:
+                self._model.clear_search()
+            elif cmd_parts[0] == 'profile' and len(cmd_parts) == 2 and cmd_parts[1] in ('on', 'off'):
+                if cmd_parts[1] == 'on':
+                    PROFILER.reset()
+                    PROFILER.enable()
+                else:
+                    PROFILER.disable()
+            elif cmd_parts[0] == 'stats' and len(cmd_parts) == 1:
+                message = PROFILER.summary()
+            elif cmd_parts[0] == 'stats' and len(cmd_parts) == 2:
+                PROFILER.dump(cmd_parts[1])
+                message = f"stats written to {cmd_parts[1]}"
             elif cmd_parts[0] == 'h' and len(cmd_parts) == 1:
                 self._model.load_file("helper.txt")
             else:
                 raise RuntimeError("Unknown command")
 
         except Exception as e:
-            raise RuntimeError(f"Command error: {str(e)}")
+            # Ошибка команды (нет файла, неверный аргумент) показывается в командной строке, редактор продолжает работу
+            message = f"Command error: {str(e)}"
         finally:
+            self._model.set_command_buf(message)
             self.deactivate()
-            self._model.set_command_buf("")
+
+    def _swap_warning(self) -> str:
+        owner = self._model.swap_owner()
+        if owner:
+            return f"swap file exists: the file is being edited by {owner}, changes are not journaled"
+        return "swap file found, use :recover to restore unsaved changes" if self._model.has_swap() else ""
+
+    def _buffer_list(self) -> str:
+        """Список документов в одну строку: номер, % у текущего, + у измененного"""
+        entries = []
+        for number, (filename, current, modified, state) in enumerate(self._model.list_buffers(), 1):
+            flags = ("%" if current else "") + ("+" if modified else "")
+            entries.append(f"{number}{flags} \"{filename or '[No Name]'}\" {state}")
+        return " | ".join(entries)
@@ -1,24 +1,31 @@
 import curses
-from typing import Dict, Any
+import time
+from typing import Callable, Dict, Any, Optional
 from abc import ABC, abstractmethod
 from my_string import my_string as MyString
 from controller.command_handler import CommandHandler
 from controller.find_handler import FindHandler
 from curses_adapter import CursesAdapter
 from interfaces.ICommandState import ICommandState
-from interfaces.IControllerAdapter import IControllerAdapter
+from interfaces.IControllerAdapter import IControllerAdapter, KEY_PASTE
 from model.model import IModel
+from profiler import PROFILER
 
 KEY_LEFT = 260
 KEY_RIGHT = 261
 KEY_UP = 259
 KEY_DOWN = 258
-PAGE_UP = 57
-PAGE_DOWN = 51
+PAGE_UP = curses.KEY_PPAGE
+PAGE_DOWN = curses.KEY_NPAGE
+CTRL_R = 18
+CTRL_G = 7
+FRAME_INTERVAL = 1 / 60  # Не больше 60 перерисовок в секунду
+IDLE_TIMEOUT = 0.1  # Как часто без ввода проверяются события фоновых задач
+
 
 class IController(ABC):
     @abstractmethod
-    def handle_input(self) -> None:
+    def handle_input(self, char: Optional[int] = None) -> None:
         pass
 
 
@@ -26,7 +33,7 @@ class VimController(IController):
     def __init__(self, model: IModel, adapter: IControllerAdapter) -> None:
         self.model = model
         self._adapter = adapter
-        self.modes = ['normal', 'insert', 'command']
+        self.modes = ['normal', 'insert', 'command', 'visual']
         self.current_mode = 'normal'
         self._command_buffer = MyString("")
         self.command_map = self._create_command_map()
@@ -35,6 +42,9 @@ class VimController(IController):
         self.normal_buffer = "aaa"
         self.numbers_buffer = ""
         self.copy_buffer = ""
+        self._last_change: Optional[Callable[[int], None]] = None  # Последняя правка для повтора через .
+        self._last_count = 1
+        self._last_frame = 0.0
         self.state: ICommandState
 
     @property
@@ -65,14 +75,21 @@ class VimController(IController):
                 ord('w'): lambda: self.model.word_to_end(),
                 ord('b'): lambda: self.model.word_to_start(),
                 ord('G'): lambda: self.file_to_end(),
-                ord('x'): lambda: self.model.delete_char_inv(),
-                ord('p'): lambda: self.paste(),
+                ord('%'): self.percent_jump,
+                CTRL_G: lambda: self.model.set_notice(self.model.file_info()),
+                ord('x'): lambda: self._repeatable(self.model.delete_char_inv),
+                ord('p'): lambda: self._repeatable(self.paste),
+                ord('.'): self.repeat_last_change,
                 ord('i'): self._enter_insert_mode,
                 ord('I'): self._enter_insert_mode_start_str,
                 ord('A'): self._enter_insert_mode_finish_str,
                 ord('S'): self._enter_insert_mode_delete_str,
                 ord('r'): self.replace,
+                ord('u'): self.model.undo,
+                CTRL_R: self.model.redo,
                 ord(':'): self._enter_command_mode,
+                ord('v'): lambda: self._enter_visual_mode(False),
+                ord('V'): lambda: self._enter_visual_mode(True),
                 ord('/'): lambda: self._enter_find_mode(True),
                 ord('?'): lambda: self._enter_find_mode(False),
                 8: self.model.delete_char,  # Backspace
@@ -93,6 +110,29 @@ class VimController(IController):
             },
             'command': {
 
+            },
+            'visual': {
+                27: self._leave_visual_mode,  # ESC
+                ord('v'): self._leave_visual_mode,
+                ord('V'): self._leave_visual_mode,
+                ord('d'): self._visual_delete,
+                ord('x'): self._visual_delete,
+                ord('y'): self._visual_yank,
+                ord('>'): lambda: self._visual_indent(1),
+                ord('<'): lambda: self._visual_indent(-1),
+                ord('r'): self._visual_replace,
+                ord('^'): lambda: self.model.str_to_start(),
+                ord('$'): lambda: self.model.str_to_end(),
+                ord('w'): lambda: self.model.word_to_end(),
+                ord('b'): lambda: self.model.word_to_start(),
+                ord('G'): lambda: self.file_to_end(),
+                ord('%'): self.percent_jump,
+                KEY_LEFT: lambda: self.model.move_cursor(-1, 0),
+                KEY_RIGHT: lambda: self.model.move_cursor(1, 0),
+                KEY_UP: lambda: self.model.move_cursor(0, -1),
+                KEY_DOWN: lambda: self.model.move_cursor(0, 1),
+                PAGE_UP: lambda: self.model.page_up(self._adapter.get_screen_size()[0]),
+                PAGE_DOWN: lambda: self.model.page_down(self._adapter.get_screen_size()[0]),
             },
             'find': {
 
@@ -100,41 +140,46 @@ class VimController(IController):
         }
 
     def _enter_insert_mode_start_str(self) -> None:
+        self.model.begin_change()
         self.model.str_to_start(),
         self.current_mode = 'insert'
         self.normal_buffer = "aaa"
         self.model.set_status(self.current_mode)
-        self.model.notify_observers("text_changed", "")
+        self.model.notify_observers("status_changed", "")
 
     def _enter_insert_mode_finish_str(self) -> None:
+        self.model.begin_change()
         self.model.str_to_end(),
         self.current_mode = 'insert'
         self.normal_buffer = "aaa"
         self.model.set_status(self.current_mode)
-        self.model.notify_observers("text_changed", "")
+        self.model.notify_observers("status_changed", "")
 
     def _enter_insert_mode_delete_str(self) -> None:
+        self.model.begin_change()
         self.model.delete_str(),
         self.current_mode = 'insert'
         self.normal_buffer = "aaa"
         self.model.set_status(self.current_mode)
-        self.model.notify_observers("text_changed", "")
+        self.model.notify_observers("status_changed", "")
 
     def replace(self):
-        char = self._adapter.get_char()
-        self.model.replace(chr(char))
+        char = chr(self._adapter.get_char())
+        self._repeatable(lambda count: self.model.replace(char, count))
 
     def _enter_insert_mode(self) -> None:
+        self.model.begin_change()
         self.current_mode = 'insert'
         self.normal_buffer = "aaa"
         self.model.set_status(self.current_mode)
-        self.model.notify_observers("text_changed", "")
+        self.model.notify_observers("status_changed", "")
 
     def _enter_normal_mode(self) -> None:
+        self.model.end_change()
         self.current_mode = 'normal'
         self.normal_buffer = "aaa"
         self.model.set_status(self.current_mode)
-        self.model.notify_observers("text_changed", "")
+        self.model.notify_observers("status_changed", "")
 
     def _enter_command_mode(self) -> None:
         self.state = self.command_handler
@@ -142,7 +187,7 @@ class VimController(IController):
         self.current_mode = 'command'
         self.normal_buffer = "aaa"
         self.model.set_status(self.current_mode)
-        self.model.notify_observers("text_changed", "")
+        self.model.notify_observers("status_changed", "")
 
     def _enter_find_mode(self, before: bool) -> None:
         self.state = self.find_handler
@@ -150,33 +195,132 @@ class VimController(IController):
         self.current_mode = 'find'
         self.normal_buffer = "aaa"
         self.model.set_status(self.current_mode)
-        self.model.notify_observers("text_changed", "")
+        self.model.notify_observers("status_changed", "")
 
-    def paste(self) -> None:
-        self.model.paste(self.copy_buffer)
+    def _enter_visual_mode(self, linewise: bool) -> None:
+        self.model.start_selection(linewise)
+        self.current_mode = 'visual'
+        self.normal_buffer = "aaa"
+        self.model.set_status(self.current_mode)
+        self.model.notify_observers("status_changed", "")
 
-    def file_to_end(self) -> None:
-        if len(self.numbers_buffer) > 0:
-            self.model.set_cursor_pos(0, int(self.numbers_buffer) - 1)
+    def _leave_visual_mode(self) -> None:
+        self.model.clear_selection()
+        self._enter_normal_mode()
+
+    def _visual_delete(self) -> None:
+        x0, y0, x1, y1, linewise = self.model.get_selection()
+        if linewise:
+            self.copy_buffer = self.model.get_range(x0, y0, x1, y1)
+            self.model.delete_range(*self.model.line_span(y0, y1 + 1))
+            self.model.set_cursor_pos(0, min(y0, self.model.get_len() - 1))
         else:
-            self.model.set_cursor_pos(0, self.model.get_len() - 1)
+            self.copy_buffer = self.model.delete_range(x0, y0, x1, y1)
+        self._leave_visual_mode()
+
+    def _visual_yank(self) -> None:
+        x0, y0, x1, y1, linewise = self.model.get_selection()
+        self.copy_buffer = self.model.get_range(x0, y0, x1, y1)
+        self.model.set_cursor_pos(x0, y0)
+        self._leave_visual_mode()
+
+    def _visual_indent(self, shift: int) -> None:
+        x0, y0, x1, y1, linewise = self.model.get_selection()
+        self.model.indent_range(y0, y1, shift)
+        self._leave_visual_mode()
+
+    def _visual_replace(self) -> None:
+        char = chr(self._adapter.get_char())
+        x0, y0, x1, y1, linewise = self.model.get_selection()
+        self.model.replace_range(x0, y0, x1, y1, char)
+        self._leave_visual_mode()
+
+    def paste(self, count: int = 1) -> None:
+        self.model.paste(self.copy_buffer, count)
+
+    def _take_count(self) -> Optional[int]:
+        """Забирает набранный перед командой счетчик"""
+        count = int(self.numbers_buffer) if self.numbers_buffer else None
         self.numbers_buffer = ""
+        return count
+
+    def _repeatable(self, action: Callable[[int], None]) -> None:
+        """Выполняет правку со счетчиком одной операцией модели и запоминает ее для повтора"""
+        count = self._take_count() or 1
+        self._last_change = action
+        self._last_count = count
+        action(count)
+
+    def repeat_last_change(self) -> None:
+        if self._last_change is None:
+            return
+        self._last_count = self._take_count() or self._last_count
+        self._last_change(self._last_count)
+
+    def file_to_end(self) -> None:
+        """G - в конец файла, NG - на строку N"""
+        count = self._take_count()
+        self.model.go_to_line(count if count is not None else self.model.get_len())
+
+    def percent_jump(self) -> None:
+        """N% - на строку, стоящую на N процентах файла; без счетчика ничего не делает"""
+        count = self._take_count()
+        if count is not None:
+            self.model.go_to_percent(count)
 
     def start(self):
         self.model.set_status("normal")
         while True:
-            self.handle_input()
+            self.run_once()
+
+    def run_once(self, idle_timeout: float = IDLE_TIMEOUT) -> int:
+        """Один кадр: ждет ввод, применяет все уже пришедшие клавиши и перерисовывает экран один раз.
 
-    def handle_input(self) -> None:
+        Клавиши, пришедшие до следующего кадра (вставка в терминал, автоповтор), попадают в этот же кадр.
+        Возвращает число обработанных клавиш.
+        """
+        handled = 0
+        # Все события кадра копятся и дают одну перерисовку
+        with self.model.event_manager().batch():
+            self.model.poll_events()
+            char = self._adapter.wait_char(idle_timeout)
+            if char == -1:
+                return handled
+            self.handle_input(char)
+            handled += 1
+            deadline = max(time.monotonic(), self._last_frame + FRAME_INTERVAL)
+            while True:
+                char = self._adapter.get_char_nowait()
+                if char == -1:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    char = self._adapter.wait_char(remaining)
+                    if char == -1:
+                        break
+                self.handle_input(char)
+                handled += 1
+        self._last_frame = time.monotonic()
+        return handled
+
+    def handle_input(self, char: Optional[int] = None) -> None:
+        if self.model.get_notice():
+            # Сообщение показывается до следующей клавиши
+            self.model.set_notice("")
         if not self.command_handler.is_active and self.current_mode == "command":
             self.current_mode = "normal"
             self.model.set_status(self.current_mode)
-            self.model.notify_observers("text_changed", "")
+            self.model.notify_observers("status_changed", "")
         if not self.find_handler.is_active and self.current_mode == "find":
             self.current_mode = "normal"
             self.model.set_status(self.current_mode)
-            self.model.notify_observers("text_changed", "")
-        char = self._adapter.get_char()
+            self.model.notify_observers("status_changed", "")
+        if char is None:
+            char = self._adapter.get_char()
+        if char == KEY_PASTE:
+            self._handle_paste(self._adapter.get_paste())
+            self.model.notify_observers("cursor_moved", "")
+            return
         handler = self.command_map[self.current_mode].get(char)
         # file = open("log.txt", "a+")
         # file.write(str(int(char)) + "\n")
@@ -187,29 +331,10 @@ class VimController(IController):
         if trig == 0:
             if handler:
                 handler()
-            elif self.current_mode == 'normal' and char < 256:
-                now_char = str(chr(char))
-                if '0' <= now_char <= '9':
-                    self.numbers_buffer += now_char
-                else:
+                if self.current_mode == 'normal':
                     self.numbers_buffer = ""
-                    self.normal_buffer += str(chr(char))
-                    if len(self.normal_buffer) > 3:
-                        self.normal_buffer = self.normal_buffer[1:]
-                    if self.normal_buffer == "diw":
-                        self.model.delete_word()
-                        self.normal_buffer = "aaa"
-                    elif self.normal_buffer[1:] == "gg":
-                        self.model.set_cursor_pos(0, 0)
-                    elif self.normal_buffer[1:] == "dd":
-                        self.model.delete_str()
-                        self.normal_buffer = "aaa"
-                    elif self.normal_buffer[1:] == "yy":
-                        self.copy_buffer = self.model.copy_str()
-                        self.normal_buffer = "aaa"
-                    elif self.normal_buffer[1:] == "yw":
-                        self.copy_buffer = self.model.copy_word()
-                        self.normal_buffer = "aaa"
+            elif self.current_mode == 'normal' and char < 256:
+                self._handle_normal_sequence(char)
             elif self.current_mode == 'insert' and char < 256:
                 self.model.insert_char(chr(char))
                 #self.model.notify_observers("text_changed", "")
@@ -229,27 +354,52 @@ class VimController(IController):
                 #     self._command_buffer = MyString(new_content)
                 #     self.view.update()
         else:
-            now_char = str(chr(char))
-            if '0' <= now_char <= '9':
-                self.numbers_buffer += now_char
-            else:
-                self.numbers_buffer = ""
-                self.normal_buffer += str(chr(char))
-                if len(self.normal_buffer) > 3:
-                    self.normal_buffer = self.normal_buffer[1:]
-                if self.normal_buffer == "diw":
-                    self.model.delete_word()
-                    self.normal_buffer = "aaa"
-                elif self.normal_buffer[1:] == "gg":
-                    self.model.set_cursor_pos(0, 0)
-                elif self.normal_buffer[1:] == "dd":
-                    self.model.delete_str()
-                    self.normal_buffer = "aaa"
-                elif self.normal_buffer[1:] == "yy":
-                    self.copy_buffer = self.model.copy_str()
-                    self.normal_buffer = "aaa"
-                elif self.normal_buffer[1:] == "yw":
-                    self.copy_buffer = self.model.copy_word()
-                    self.normal_buffer = "aaa"
-
-        self.model.notify_observers("text_changed", "")
+            self._handle_normal_sequence(char)
+
+        self.model.notify_observers("cursor_moved", "")
+
+    def _handle_paste(self, text: str) -> None:
+        """Вставка из терминала: в тексте - одной операцией модели, в строке команды/поиска - первая строка"""
+        if self.current_mode == 'insert':
+            self.model.insert_text(text)
+        elif self.current_mode == 'normal':
+            self.model.paste(text)
+        elif self.current_mode in ('command', 'find'):
+            state = self.command_handler if self.current_mode == 'command' else self.find_handler
+            for char in text.split('\n', 1)[0]:
+                if state.is_active:
+                    state.handle_input(ord(char))
+
+    def _handle_normal_sequence(self, char: int) -> None:
+        """Счетчик и многосимвольные команды нормального режима (dd, yy, yw, diw, gg)"""
+        now_char = str(chr(char))
+        if '0' <= now_char <= '9' and (now_char != '0' or self.numbers_buffer):
+            self.numbers_buffer += now_char
+            return
+        if now_char == '0':
+            self.model.str_to_start()
+            return
+        self.normal_buffer += now_char
+        if len(self.normal_buffer) > 3:
+            self.normal_buffer = self.normal_buffer[1:]
+        if self.normal_buffer == "diw":
+            self._repeatable(self.model.delete_word)
+            self.normal_buffer = "aaa"
+        elif self.normal_buffer[1:] == "gg":
+            self.model.go_to_line(self._take_count() or 1)
+        elif self.normal_buffer[1:] == "dd":
+            self._repeatable(self.model.delete_str)
+            self.normal_buffer = "aaa"
+        elif self.normal_buffer[1:] == "yy":
+            self.copy_buffer = self.model.copy_str(self._take_count() or 1)
+            self.normal_buffer = "aaa"
+        elif self.normal_buffer[1:] == "yw":
+            self.copy_buffer = self.model.copy_word()
+            self.normal_buffer = "aaa"
+            self.numbers_buffer = ""
+        elif now_char not in "dyig":
+            self.numbers_buffer = ""
+
+
+PROFILER.frame(VimController, "run_once")
+PROFILER.phase(VimController, "handle_input", "model")
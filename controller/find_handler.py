@@ -28,12 +28,12 @@ class FindHandler(ICommandState):
         self._search_forward = forward
         self._buffer = MyString("")
         self._update_display()
-        self._model.notify_observers("text_changed", "")
+        self._model.notify_observers("status_changed", "")
 
     def deactivate(self) -> None:
         self._active = False
         self._model.search = False
-        self._model.notify_observers("text_changed", "")
+        self._model.notify_observers("status_changed", "")
         self._model.set_command_buf("")
 
     def handle_input(self, char: int) -> None:
@@ -41,10 +41,10 @@ class FindHandler(ICommandState):
             # Обработка команд n/N без активации
             if char == ord('n'):
                 self._search_forward = True
-                self._model.search_string(self._last_search, self._search_forward)
+                self._model.search_string(self._last_search, self._search_forward, self._escape_pressed)
             elif char == ord('N'):
                 self._search_forward = False
-                self._model.search_string(self._last_search, self._search_forward)
+                self._model.search_string(self._last_search, self._search_forward, self._escape_pressed)
             else:
                 self._model.search = False
             self._model.notify_observers("cursor_moved", "")
@@ -60,28 +60,34 @@ class FindHandler(ICommandState):
             self._add_char(chr(char))
 
     def _add_char(self, char: str) -> None:
-        self._buffer = MyString(self.buffer + char)
+        self._buffer.append(char)
         self._update_display()
 
     def _delete_char(self) -> None:
         if len(self._buffer) > 0:
-            new_len = self._buffer.size() - 1
-            self._buffer = MyString(self._buffer.substr(0, new_len))
+            self._buffer.split_off(self._buffer.size() - 1)
             self._update_display()
 
+    def _escape_pressed(self) -> bool:
+        """Отмена долгого поиска: ESC извлекается, любая другая клавиша остается в очереди"""
+        if self._adapter.peek_char() != 27:
+            return False
+        self._adapter.get_char_nowait()
+        return True
+
     def _update_display(self):
         self._model.search = False
         self._model.set_command_buf(self._get_prompt() + self.buffer)
         rows, cols = self._adapter.get_screen_size()
         self._adapter.move_cursor(rows - 1, 1 + len(self.buffer))
-        self._model.notify_observers("text_changed", "")
+        self._model.notify_observers("status_changed", "")
 
     def _get_prompt(self):
         return "?" if self._search_forward else "/"
 
     def _execute_command(self):
         self._last_search = self.buffer
-        self._model.search_string(self._last_search, self._search_forward)
+        self._model.search_string(self._last_search, self._search_forward, self._escape_pressed)
         self._model.search = True
         # if self._search_forward:
         #     self._model.find_after()
@@ -1,19 +1,60 @@
 import curses
-from typing import Tuple
-from interfaces.IControllerAdapter import IControllerAdapter
+import sys
+from typing import Dict, Optional, Tuple
+from interfaces.IControllerAdapter import IControllerAdapter, KEY_PASTE
 from interfaces.IViewAdapter import IViewAdapter
+from profiler import PROFILER
+
+PASTE_START = b"[200~"  # После ESC
+PASTE_END = b"\x1b[201~"
+PASTE_TIMEOUT = 1000  # мс ожидания продолжения вставки
+# Стили подсветки синтаксиса: цвет текста и атрибут (атрибут используется и без цветов)
+SYNTAX_STYLES = {
+    'keyword': (curses.COLOR_MAGENTA, curses.A_BOLD),
+    'constant': (curses.COLOR_MAGENTA, curses.A_NORMAL),
+    'string': (curses.COLOR_GREEN, curses.A_NORMAL),
+    'comment': (curses.COLOR_CYAN, curses.A_NORMAL),
+    'number': (curses.COLOR_YELLOW, curses.A_NORMAL),
+    'key': (curses.COLOR_BLUE, curses.A_BOLD),
+    'error': (curses.COLOR_RED, curses.A_BOLD),
+    'warning': (curses.COLOR_YELLOW, curses.A_BOLD),
+    'info': (curses.COLOR_GREEN, curses.A_NORMAL),
+}
 
 
 class CursesAdapter(IControllerAdapter, IViewAdapter):
 
     def __init__(self) -> None:
         self.screen = curses.initscr()
+        self._styles: Dict[str, int] = {}  # Имя стиля -> атрибут curses
+        self._paste = ""
+        self._peeked: Optional[int] = None  # Клавиша, прочитанная peek_char и еще не отданная
 
     def init_curses(self) -> None:
         curses.noecho()
         curses.cbreak()
         self.screen.keypad(True)
         curses.start_color()
+        if curses.has_colors():
+            curses.init_pair(1, curses.COLOR_BLACK, curses.COLOR_YELLOW)
+            self._styles['search'] = curses.color_pair(1)
+            background = curses.COLOR_BLACK
+            try:
+                curses.use_default_colors()
+                background = -1  # Фон терминала по умолчанию
+            except curses.error:
+                pass
+            for pair, (style, (color, attr)) in enumerate(SYNTAX_STYLES.items(), 2):
+                curses.init_pair(pair, color, background)
+                self._styles[style] = curses.color_pair(pair) | attr
+        else:
+            self._styles['search'] = curses.A_REVERSE
+            for style, (color, attr) in SYNTAX_STYLES.items():
+                self._styles[style] = attr
+        self._styles['selection'] = curses.A_REVERSE
+        # Терминал будет обрамлять вставленный текст ESC[200~ ... ESC[201~
+        sys.stdout.write("\x1b[?2004h")
+        sys.stdout.flush()
 
     def get_screen_size(self) -> Tuple[int, int]:
         return self.screen.getmaxyx()
@@ -21,8 +62,11 @@ class CursesAdapter(IControllerAdapter, IViewAdapter):
     def clear_screen(self) -> None:
         self.screen.clear()
 
-    def add_str(self, x: int, y: int, text: str) -> None:
-        self.screen.addstr(x, y, text)
+    def add_str(self, x: int, y: int, text: str, style: Optional[str] = None) -> None:
+        if style is None:
+            self.screen.addstr(x, y, text)
+        else:
+            self.screen.addstr(x, y, text, self._styles.get(style, curses.A_NORMAL))
         # curses.curs_set(0)
         # try:
         #     self.screen.addstr(y, x, text)
@@ -30,6 +74,10 @@ class CursesAdapter(IControllerAdapter, IViewAdapter):
         #     pass
         # curses.curs_set(1)
 
+    def clear_line(self, row: int) -> None:
+        self.screen.move(row, 0)
+        self.screen.clrtoeol()
+
     def move_cursor(self, x: int, y: int) -> None:
         try:
             self.screen.move(y, x)
@@ -40,8 +88,102 @@ class CursesAdapter(IControllerAdapter, IViewAdapter):
     def refresh(self) -> None:
         self.screen.refresh()
 
+    def noutrefresh(self) -> None:
+        self.screen.noutrefresh()
+
+    def doupdate(self) -> None:
+        curses.doupdate()
+
     def get_char(self) -> int:
-        return self.screen.getch()
+        if self._peeked is not None:
+            return self._take_peeked()
+        return self._read(self.screen.getch())
+
+    def _take_peeked(self) -> int:
+        char, self._peeked = self._peeked, None
+        return char
+
+    def _read(self, char: int) -> int:
+        """Распознает начало вставки после ESC; иначе возвращает прочитанные символы обратно в очередь"""
+        if char != 27:
+            return char
+        self.screen.nodelay(True)
+        try:
+            sequence = []
+            for expected in PASTE_START:
+                next_char = self.screen.getch()
+                if next_char == -1:
+                    break
+                sequence.append(next_char)
+                if next_char != expected:
+                    break
+            else:
+                self._paste = self._read_paste()
+                return KEY_PASTE
+            for next_char in reversed(sequence):
+                curses.ungetch(next_char)
+            return char
+        finally:
+            self.screen.nodelay(False)
+
+    def _read_paste(self) -> str:
+        data = bytearray()
+        self.screen.timeout(PASTE_TIMEOUT)
+        try:
+            while not data.endswith(PASTE_END):
+                char = self.screen.getch()
+                if char == -1:
+                    break
+                if char < 256:
+                    data.append(char)
+        finally:
+            self.screen.timeout(-1)
+        if data.endswith(PASTE_END):
+            del data[-len(PASTE_END):]
+        text = data.decode('utf-8', errors='replace')
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+
+    def get_paste(self) -> str:
+        """Текст последней вставки (после кода KEY_PASTE)"""
+        return self._paste
+
+    def get_char_nowait(self) -> int:
+        """Код нажатой клавиши или -1, если ничего не нажато"""
+        if self._peeked is not None:
+            return self._take_peeked()
+        self.screen.nodelay(True)
+        try:
+            char = self.screen.getch()
+        finally:
+            self.screen.nodelay(False)
+        return self._read(char)
+
+    def peek_char(self) -> int:
+        # Клавиша (или целая вставка) уже разобрана и отдается следующему get_char без повторного чтения
+        if self._peeked is None:
+            char = self.get_char_nowait()
+            if char == -1:
+                return -1
+            self._peeked = char
+        return self._peeked
+
+    def wait_char(self, timeout: float) -> int:
+        """Код клавиши или -1, если за timeout секунд ничего не нажато"""
+        if self._peeked is not None:
+            return self._take_peeked()
+        self.screen.timeout(max(0, int(timeout * 1000)))
+        try:
+            char = self.screen.getch()
+        finally:
+            self.screen.timeout(-1)
+        return self._read(char)
 
     def end_curses(self) -> None:
+        sys.stdout.write("\x1b[?2004l")
+        sys.stdout.flush()
         curses.endwin()
+
+
+PROFILER.phase(CursesAdapter, "_read", "input")
+PROFILER.phase(CursesAdapter, "doupdate", "draw")
+PROFILER.count(CursesAdapter, "add_str", "add_str")
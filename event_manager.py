@@ -1,11 +1,21 @@
-from typing import Dict, List, Any
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Any
 
 from interfaces.IModel import IModel
 from interfaces.event_listener import EventListener
+from model.damage import Damage
+from profiler import PROFILER
+
+# События, которые нужны только для перерисовки курсора и статусной строки: text_changed их поглощает
+LIGHT_EVENTS = ("cursor_moved", "status_changed")
+
 
 class EventManager:
     def __init__(self):
         self._listeners: Dict[str, List[EventListener]] = {}
+        self._batch_depth = 0
+        self._model: Any = None
+        self._pending: List[List[Any]] = []  # [тип события, данные] в порядке поступления
 
     def subscribe(self, event_type: str, listener: EventListener) -> None:
         """Подписывает слушателя на определенный тип события"""
@@ -19,7 +29,52 @@ class EventManager:
             self._listeners[event_type].remove(listener)
 
     def notify(self, model: IModel, event_type: str, data: Any = None) -> None:
-        """Уведомляет всех подписчиков о событии"""
+        """Уведомляет всех подписчиков о событии; внутри batch() событие откладывается до flush()"""
+        if self._batch_depth:
+            self._model = model
+            self._queue(event_type, data)
+            return
         if event_type in self._listeners:
             for listener in self._listeners[event_type]:
-                listener.update(model, event_type, data)
\ No newline at end of file
+                listener.update(model, event_type, data)
+
+    def _queue(self, event_type: str, data: Any) -> None:
+        """Склеивает событие с уже отложенным того же типа"""
+        for entry in self._pending:
+            if entry[0] != event_type:
+                continue
+            if event_type == "text_changed":
+                # Диапазоны объединяются; изменение без диапазона означает полную перерисовку
+                if isinstance(entry[1], Damage) and isinstance(data, Damage):
+                    entry[1] = entry[1].merge(data)
+                else:
+                    entry[1] = None
+                return
+            if event_type in LIGHT_EVENTS:
+                return
+        self._pending.append([event_type, data])
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """События внутри блока копятся и рассылаются один раз при выходе из внешнего блока"""
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
+
+    def flush(self) -> None:
+        """Рассылает отложенные события: каждому слушателю - не больше одного события каждого типа"""
+        pending, self._pending = self._pending, []
+        text_listeners = self._listeners.get("text_changed", []) \
+            if any(event_type == "text_changed" for event_type, _ in pending) else []
+        for event_type, data in pending:
+            for listener in self._listeners.get(event_type, []):
+                if event_type in LIGHT_EVENTS and listener in text_listeners:
+                    continue
+                listener.update(self._model, event_type, data)
+
+
+PROFILER.phase(EventManager, "flush", "dispatch")
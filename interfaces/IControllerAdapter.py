@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Tuple
+from typing import Optional, Tuple
+
+KEY_PASTE = 1 << 20  # Код "клавиши" для вставленного через bracketed paste блока текста
 
 
 class IControllerAdapter(ABC):
@@ -20,7 +22,7 @@ class IControllerAdapter(ABC):
         pass
 
     @abstractmethod
-    def add_str(self, x: int, y: int, text: str) -> None:
+    def add_str(self, x: int, y: int, text: str, style: Optional[str] = None) -> None:
         pass
 
     @abstractmethod
@@ -35,6 +37,23 @@ class IControllerAdapter(ABC):
     def get_char(self) -> int:
         pass
 
+    @abstractmethod
+    def get_char_nowait(self) -> int:
+        pass
+
+    @abstractmethod
+    def peek_char(self) -> int:
+        """Код следующей клавиши без извлечения из очереди или -1, если ничего не нажато"""
+        pass
+
+    @abstractmethod
+    def wait_char(self, timeout: float) -> int:
+        pass
+
+    @abstractmethod
+    def get_paste(self) -> str:
+        pass
+
     @abstractmethod
     def end_curses(self) -> None:
         pass
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Tuple, List
+from typing import Tuple
+
+from interfaces.ITextBuffer import ITextBuffer
 
 
 class ICursor(ABC):
@@ -13,5 +15,5 @@ class ICursor(ABC):
         pass
 
     @abstractmethod
-    def move_cursor(self, dx: int, dy: int, lines: List) -> None:
+    def move_cursor(self, dx: int, dy: int, buffer: ITextBuffer) -> None:
         pass
@@ -0,0 +1,23 @@
+from abc import ABC, abstractmethod
+from typing import List, Tuple
+
+Token = Tuple[int, int, str]  # Участок строки (начало, конец, стиль)
+
+
+class ILexer(ABC):
+
+    @property
+    @abstractmethod
+    def stateless(self) -> bool:
+        """Строки разбираются независимо друг от друга (состояние всегда 0)"""
+        pass
+
+    @abstractmethod
+    def lex(self, line: str, state: int) -> Tuple[List[Token], int]:
+        """Токены строки, которая начинается в состоянии state, и состояние в конце строки"""
+        pass
+
+    @abstractmethod
+    def end_state(self, line: str, state: int) -> int:
+        """Только состояние в конце строки; может быть быстрее полного разбора"""
+        pass
@@ -0,0 +1,25 @@
+from abc import ABC, abstractmethod
+from typing import List, Sequence
+
+
+class ILineSource(ABC):
+
+    @abstractmethod
+    def get_line_count(self) -> int:
+        pass
+
+    @abstractmethod
+    def get_line(self, y: int) -> str:
+        pass
+
+    @abstractmethod
+    def get_lines(self, start: int, stop: int) -> List[str]:
+        pass
+
+    @abstractmethod
+    def get_line_lengths(self, start: int, stop: int) -> Sequence[int]:
+        pass
+
+    @abstractmethod
+    def get_raw(self, start: int, stop: int) -> bytes:
+        pass
@@ -1,4 +1,4 @@
-from typing import List, Tuple, Any
+from typing import List, Tuple, Any, Callable, Optional
 from abc import ABC, abstractmethod
 
 
@@ -8,6 +8,18 @@ class IModel(ABC):
     def get_data(self) -> Tuple[List[str], Tuple[int, int]]:
         pass
 
+    @abstractmethod
+    def get_line(self, y: int) -> str:
+        pass
+
+    @abstractmethod
+    def get_lines(self, start: int, stop: int) -> List[str]:
+        pass
+
+    @abstractmethod
+    def get_line_lengths(self, start: int, stop: int) -> List[int]:
+        pass
+
     @abstractmethod
     def insert_char(self, char: str) -> None:
         pass
@@ -21,7 +33,12 @@ class IModel(ABC):
         pass
 
     @abstractmethod
-    def save_file(self, filename: str) -> None:
+    def save_file(self, filename: str, background: bool = False, force: bool = False,
+                  rename: bool = False) -> None:
+        pass
+
+    @abstractmethod
+    def poll_events(self) -> None:
         pass
 
     @abstractmethod
@@ -32,6 +49,10 @@ class IModel(ABC):
     def get_cursor_pos(self) -> Tuple[int, int]:
         pass
 
+    @abstractmethod
+    def event_manager(self) -> 'EventManager':
+        pass
+
     @abstractmethod
     def add_observer(self, self1, param):
         pass
@@ -52,6 +73,14 @@ class IModel(ABC):
     def get_status(self) -> str:
         pass
 
+    @abstractmethod
+    def set_notice(self, text: str) -> None:
+        pass
+
+    @abstractmethod
+    def get_notice(self) -> str:
+        pass
+
     @abstractmethod
     def get_command_buf(self) -> str:
         pass
@@ -81,11 +110,11 @@ class IModel(ABC):
         pass
 
     @abstractmethod
-    def delete_char_inv(self) -> None:
+    def delete_char_inv(self, count: int = 1) -> None:
         pass
 
     @abstractmethod
-    def delete_word(self) -> None:
+    def delete_word(self, count: int = 1) -> None:
         pass
 
     @abstractmethod
@@ -93,15 +122,19 @@ class IModel(ABC):
         pass
 
     @abstractmethod
-    def copy_str(self) -> str:
+    def copy_str(self, count: int = 1) -> str:
         pass
 
     @abstractmethod
-    def delete_str(self) -> None:
+    def delete_str(self, count: int = 1) -> None:
         pass
 
     @abstractmethod
-    def paste(self, copy_buffer: str):
+    def insert_text(self, text: str) -> None:
+        pass
+
+    @abstractmethod
+    def paste(self, copy_buffer: str, count: int = 1):
         pass
 
     @abstractmethod
@@ -117,7 +150,55 @@ class IModel(ABC):
         pass
 
     @abstractmethod
-    def replace(self, char: str):
+    def replace(self, char: str, count: int = 1):
+        pass
+
+    @abstractmethod
+    def get_range(self, x0: int, y0: int, x1: int, y1: int) -> str:
+        pass
+
+    @abstractmethod
+    def delete_range(self, x0: int, y0: int, x1: int, y1: int) -> str:
+        pass
+
+    @abstractmethod
+    def replace_range(self, x0: int, y0: int, x1: int, y1: int, char: str) -> None:
+        pass
+
+    @abstractmethod
+    def indent_range(self, y0: int, y1: int, shift: int) -> None:
+        pass
+
+    @abstractmethod
+    def line_span(self, start: int, stop: int) -> Tuple[int, int, int, int]:
+        pass
+
+    @abstractmethod
+    def start_selection(self, linewise: bool) -> None:
+        pass
+
+    @abstractmethod
+    def clear_selection(self) -> None:
+        pass
+
+    @abstractmethod
+    def get_selection(self) -> Optional[Tuple[int, int, int, int, bool]]:
+        pass
+
+    @abstractmethod
+    def begin_change(self) -> None:
+        pass
+
+    @abstractmethod
+    def end_change(self) -> None:
+        pass
+
+    @abstractmethod
+    def undo(self) -> None:
+        pass
+
+    @abstractmethod
+    def redo(self) -> None:
         pass
 
     @abstractmethod
@@ -129,5 +210,81 @@ class IModel(ABC):
         pass
 
     @abstractmethod
-    def search_string(self, word: str, forward: bool) -> None:
+    def get_search_pattern(self) -> str:
+        pass
+
+    @abstractmethod
+    def clear_search(self) -> None:
+        pass
+
+    @abstractmethod
+    def search_string(self, word: str, forward: bool, cancelled: Optional[Callable[[], bool]] = None) -> None:
+        pass
+
+    @abstractmethod
+    def get_filename(self) -> str:
+        pass
+
+    @abstractmethod
+    def set_filename(self, filename: str) -> None:
+        pass
+
+    @abstractmethod
+    def edit_file(self, filename: str) -> None:
+        pass
+
+    @abstractmethod
+    def next_buffer(self) -> None:
+        pass
+
+    @abstractmethod
+    def prev_buffer(self) -> None:
+        pass
+
+    @abstractmethod
+    def list_buffers(self) -> List[Tuple[str, bool, bool, str]]:
+        pass
+
+    @abstractmethod
+    def has_swap(self) -> bool:
+        pass
+
+    @abstractmethod
+    def swap_owner(self) -> str:
+        pass
+
+    @abstractmethod
+    def recover(self) -> None:
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+    @abstractmethod
+    def reload_file(self) -> None:
+        pass
+
+    @abstractmethod
+    def go_to_line(self, line: int) -> None:
+        pass
+
+    @abstractmethod
+    def go_to_percent(self, percent: int) -> None:
+        pass
+
+    @abstractmethod
+    def file_info(self) -> str:
+        pass
+
+    @abstractmethod
+    def follow(self, max_lines: int) -> None:
+        pass
+
+    @abstractmethod
+    def unfollow(self) -> None:
+        pass
+
+    @abstractmethod
+    def is_following(self) -> bool:
         pass
@@ -0,0 +1,81 @@
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, List, Optional, Protocol, Sequence, Tuple, Union
+
+from interfaces.ILineSource import ILineSource
+
+
+class RawPart(Protocol):
+    """Строки [start, stop) источника, которые попадают в файл как есть, без декодирования"""
+    source: ILineSource
+    start: int
+    stop: int
+
+
+SnapshotPart = Union[Sequence[str], RawPart]  # Кусок снимка текста для записи в файл
+
+
+class ITextBuffer(ABC):
+
+    @abstractmethod
+    def reset(self, lines: Iterable[str]) -> None:
+        pass
+
+    @abstractmethod
+    def reset_lazy(self, source: ILineSource) -> None:
+        pass
+
+    @abstractmethod
+    def get_line_count(self) -> int:
+        pass
+
+    @abstractmethod
+    def get_line(self, y: int) -> str:
+        pass
+
+    @abstractmethod
+    def get_line_len(self, y: int) -> int:
+        pass
+
+    @abstractmethod
+    def get_lines(self, start: int, stop: int) -> List[str]:
+        pass
+
+    @abstractmethod
+    def get_line_lengths(self, start: int, stop: int) -> List[int]:
+        pass
+
+    @abstractmethod
+    def iter_lines(self) -> Iterator[str]:
+        pass
+
+    @abstractmethod
+    def insert(self, x: int, y: int, text: str) -> Tuple[int, int]:
+        pass
+
+    @abstractmethod
+    def delete(self, x0: int, y0: int, x1: int, y1: int) -> str:
+        pass
+
+    @abstractmethod
+    def delete_lines(self, start: int, stop: int) -> List[str]:
+        pass
+
+    @abstractmethod
+    def get_source(self) -> Optional[ILineSource]:
+        pass
+
+    @abstractmethod
+    def source_grew(self) -> None:
+        pass
+
+    @abstractmethod
+    def snapshot(self) -> List[SnapshotPart]:
+        pass
+
+    @abstractmethod
+    def memory_size(self) -> int:
+        pass
+
+    @abstractmethod
+    def compress(self) -> None:
+        pass
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Tuple
+from typing import Optional, Tuple
 
 
 class IViewAdapter(ABC):
@@ -20,7 +20,11 @@ class IViewAdapter(ABC):
         pass
 
     @abstractmethod
-    def add_str(self, x: int, y: int, text: str) -> None:
+    def add_str(self, x: int, y: int, text: str, style: Optional[str] = None) -> None:
+        pass
+
+    @abstractmethod
+    def clear_line(self, row: int) -> None:
         pass
 
     @abstractmethod
@@ -31,6 +35,14 @@ class IViewAdapter(ABC):
     def refresh(self) -> None:
         pass
 
+    @abstractmethod
+    def noutrefresh(self) -> None:
+        pass
+
+    @abstractmethod
+    def doupdate(self) -> None:
+        pass
+
     @abstractmethod
     def get_char(self) -> int:
         pass
@@ -9,6 +9,7 @@ def main():
     view = CursesView(adapter)
     model.add_observer(view, "text_changed")
     model.add_observer(view, "cursor_moved")
+    model.add_observer(view, "status_changed")
     model.add_observer(view, "file_opened")
     model.add_observer(view, "file_saved")
     controller = VimController(model, adapter)
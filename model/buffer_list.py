@@ -0,0 +1,127 @@
+import os
+from typing import List, Optional, Tuple
+
+from interfaces.ICursor import ICursor
+from interfaces.ITextBuffer import ITextBuffer
+from model.file_watcher import FileState
+from model.follower import Follower
+from model.swap_file import SwapJournal
+from model.undo import UndoJournal
+
+DEFAULT_BUDGET = 256 * 1024 * 1024  # Сколько памяти могут занимать неактивные буферы
+
+
+class Document:
+    """Открытый файл со своим курсором и журналом отмены.
+
+    Текст неактивного документа лежит в буфере как есть, в буфере со сжатыми блоками (packed)
+    или только в файле на диске (buffer is None).
+    """
+
+    def __init__(self, filename: str, buffer: ITextBuffer, cursor: ICursor, undo: UndoJournal) -> None:
+        self.filename = filename
+        self.buffer: Optional[ITextBuffer] = buffer
+        self.cursor = cursor
+        self.undo = undo
+        self.version = 0
+        self.modify = False
+        self.selection: Optional[Tuple[int, int, bool]] = None
+        self.packed = False
+        self.stamp: Optional[Tuple[int, int]] = None  # (размер, mtime) файла в момент выгрузки
+        self.journal: Optional[SwapJournal] = None  # Журнал правок для восстановления после сбоя
+        self.disk: Optional[FileState] = None  # Прочитанная часть файла: по ней видно, что файл дописан
+        self.follower: Optional[Follower] = None  # Фоновое чтение файла в режиме :follow
+        self.trimmed = 0  # Сколько первых строк файла отброшено :follow
+
+    @property
+    def partial(self) -> bool:
+        """В буфере только конец файла - текст нельзя записывать поверх файла"""
+        return self.trimmed > 0
+
+    @property
+    def state(self) -> str:
+        if self.buffer is None:
+            return "on disk"
+        return "compressed" if self.packed else "loaded"
+
+    def memory_size(self) -> int:
+        """Примерный объем памяти, занятый текстом"""
+        return self.buffer.memory_size() if self.buffer is not None else 0
+
+    def can_evict(self) -> bool:
+        """Текст совпадает с файлом на диске и его можно перечитать"""
+        return not self.modify and self.follower is None and bool(self.filename) and os.path.isfile(self.filename)
+
+    def evict(self) -> None:
+        """Освобождает текст; при возврате к документу файл читается заново"""
+        stat = os.stat(self.filename)
+        self.stamp = (stat.st_size, stat.st_mtime_ns)
+        self.buffer = None
+        self.packed = False
+
+    def compress(self) -> None:
+        """Сжимает прочитанные блоки; они распаковываются по мере чтения уже после переключения"""
+        self.buffer.compress()
+        self.packed = True
+
+    def changed_on_disk(self) -> bool:
+        """Файл изменился после выгрузки: журнал отмены к новому тексту уже не относится"""
+        try:
+            stat = os.stat(self.filename)
+        except OSError:
+            return True
+        return self.stamp != (stat.st_size, stat.st_mtime_ns)
+
+
+class BufferList:
+    """Список открытых документов и порядок обращений к ним для вытеснения (LRU)"""
+
+    def __init__(self, first: Document, budget: int = DEFAULT_BUDGET) -> None:
+        self.budget = budget
+        self.documents: List[Document] = [first]
+        self.active = 0
+        self._recent: List[Document] = [first]  # От давно не использованного к текущему
+
+    @property
+    def current(self) -> Document:
+        return self.documents[self.active]
+
+    def find(self, filename: str) -> Optional[int]:
+        path = os.path.abspath(filename)
+        for index, document in enumerate(self.documents):
+            if document.filename and os.path.abspath(document.filename) == path:
+                return index
+        return None
+
+    def add(self, document: Document) -> int:
+        self.documents.append(document)
+        self._recent.insert(0, document)
+        return len(self.documents) - 1
+
+    def select(self, index: int) -> Document:
+        self.active = index % len(self.documents)
+        document = self.documents[self.active]
+        document.packed = False
+        self._recent.remove(document)
+        self._recent.append(document)
+        return document
+
+    def enforce_budget(self) -> None:
+        """Ужимает давно не использованные неактивные документы, пока они не уложатся в бюджет.
+
+        Неизмененные документы выгружаются на диск, у измененных сжимаются прочитанные блоки.
+        """
+        current = self.current
+        inactive = [document for document in self._recent if document is not current]
+        total = sum(document.memory_size() for document in inactive)
+        for document in inactive:
+            if total <= self.budget:
+                return
+            if document.buffer is None or document.packed:
+                continue
+            before = document.memory_size()
+            if document.can_evict():
+                document.evict()
+            else:
+                document.compress()
+            total -= before - document.memory_size()
@@ -1,6 +1,7 @@
-from typing import Tuple, List
+from typing import Tuple
 
 from interfaces.ICursor import ICursor
+from interfaces.ITextBuffer import ITextBuffer
 
 
 class Cursor(ICursor):
@@ -14,9 +15,9 @@ class Cursor(ICursor):
         self._cursor_pos = (x, y)
         #print(str(x) + " " + str(y))
 
-    def move_cursor(self, dx: int, dy: int, lines: List) -> None:
-        new_y = max(0, min(self._cursor_pos[1] + dy, len(lines) - 1))
-        current_line_len = len(lines[new_y])
+    def move_cursor(self, dx: int, dy: int, buffer: ITextBuffer) -> None:
+        new_y = max(0, min(self._cursor_pos[1] + dy, buffer.get_line_count() - 1))
+        current_line_len = buffer.get_line_len(new_y)
         new_x = max(0, min(self._cursor_pos[0] + dx, current_line_len))
         self.set_pos(new_x, new_y)
         #self._notify_observers()
\ No newline at end of file
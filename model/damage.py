@@ -0,0 +1,30 @@
+class Damage:
+    """Изменение текста: старые строки [start, stop - delta) заменены новыми строками [start, stop)"""
+
+    def __init__(self, start: int, stop: int, delta: int = 0) -> None:
+        self.start = start
+        self.stop = stop
+        self.delta = delta
+
+    @property
+    def structural(self) -> bool:
+        """Изменилось число строк, все строки ниже start сдвинулись"""
+        return self.delta != 0
+
+    def __repr__(self) -> str:
+        return f"Damage({self.start}, {self.stop}, {self.delta})"
+
+    def merge(self, later: 'Damage') -> 'Damage':
+        """Одно изменение, равносильное этому и следующему за ним later (later - в координатах после этого)"""
+        old_stop = self.stop - self.delta
+        later_old_stop = later.stop - later.delta
+        # Переводим конец старого диапазона later в координаты до этого изменения
+        if later_old_stop <= self.start:
+            later_stop = later_old_stop
+        elif later_old_stop >= self.stop:
+            later_stop = later_old_stop - self.delta
+        else:
+            later_stop = old_stop
+        delta = self.delta + later.delta
+        stop = max(old_stop, later_stop)
+        return Damage(min(self.start, later.start), stop + delta, delta)
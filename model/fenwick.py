@@ -0,0 +1,59 @@
+from typing import Iterable, List, Tuple
+
+
+class FenwickTree:
+    """Дерево Фенвика: префиксные суммы и поиск по сумме за O(log n)"""
+
+    def __init__(self, values: Iterable[int] = ()) -> None:
+        self._values: List[int] = list(values)
+        n = len(self._values)
+        self._tree = [0] + self._values
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                self._tree[parent] += self._tree[i]
+        self._total = sum(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def get(self, i: int) -> int:
+        return self._values[i]
+
+    def set(self, i: int, value: int) -> None:
+        self.add(i, value - self._values[i])
+
+    def add(self, i: int, delta: int) -> None:
+        if delta == 0:
+            return
+        self._values[i] += delta
+        self._total += delta
+        n = len(self._values)
+        i += 1
+        while i <= n:
+            self._tree[i] += delta
+            i += i & -i
+
+    def total(self) -> int:
+        return self._total
+
+    def prefix_sum(self, i: int) -> int:
+        """Сумма значений с индексами [0, i)"""
+        result = 0
+        while i > 0:
+            result += self._tree[i]
+            i -= i & -i
+        return result
+
+    def find(self, k: int) -> Tuple[int, int]:
+        """Индекс i, для которого prefix_sum(i) <= k < prefix_sum(i + 1), и остаток k - prefix_sum(i)"""
+        n = len(self._values)
+        pos = 0
+        step = 1 << n.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= n and self._tree[nxt] <= k:
+                pos = nxt
+                k -= self._tree[nxt]
+            step >>= 1
+        return pos, k
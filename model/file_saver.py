@@ -0,0 +1,105 @@
+import os
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from interfaces.ILineSource import ILineSource
+from interfaces.ITextBuffer import SnapshotPart
+
+WRITE_BUFFER = 1024 * 1024
+
+
+def _umask() -> int:
+    # Узнать umask можно, только установив новую; делается один раз при импорте, до фоновых потоков
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+NEW_FILE_MODE = 0o666 & ~_umask()  # Права нового файла, как у open()
+
+
+class RawLines:
+    """Строки [start, stop) источника, которые записываются как есть, без декодирования (RawPart)"""
+
+    def __init__(self, source: ILineSource, start: int, stop: int) -> None:
+        self.source = source
+        self.start = start
+        self.stop = stop
+
+
+class FileSaver:
+    """Записывает снимок буфера во временный файл большими блоками, делает fsync и атомарно подменяет файл.
+
+    Фоновые сохранения выполняются по очереди в одном потоке, поэтому более старый снимок
+    не может перезаписать более новый.
+    """
+
+    def __init__(self) -> None:
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def save(self, filename: str, snapshot: List[SnapshotPart]) -> None:
+        # Запись идет в файл, на который указывает ссылка, а не поверх самой ссылки
+        target = os.path.realpath(filename)
+        directory = os.path.dirname(target)
+        fd, tmp_name = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(target) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb', buffering=WRITE_BUFFER) as f:
+                for part in snapshot:
+                    if isinstance(part, RawLines):
+                        f.write(part.source.get_raw(part.start, part.stop))
+                    elif part:
+                        f.write(('\n'.join(part) + '\n').encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+            self._copy_mode(tmp_name, target)
+            os.replace(tmp_name, target)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+            raise
+        self._sync_directory(directory)
+
+    @staticmethod
+    def _copy_mode(tmp_name: str, target: str) -> None:
+        """Права и владелец прежнего файла; новый файл получает права по umask, как при обычном open()"""
+        try:
+            stat = os.stat(target)
+        except FileNotFoundError:
+            os.chmod(tmp_name, NEW_FILE_MODE)
+            return
+        os.chmod(tmp_name, stat.st_mode & 0o7777)
+        if hasattr(os, 'chown'):
+            try:
+                os.chown(tmp_name, stat.st_uid, stat.st_gid)
+            except PermissionError:
+                pass  # Чужой файл: владельцем останется тот, кто записал
+
+    @staticmethod
+    def _sync_directory(directory: str) -> None:
+        # Чтобы переименование пережило сбой питания; на Windows каталоги так открыть нельзя
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def save_async(self, filename: str, snapshot: List[SnapshotPart],
+                   on_done: Callable[[str, Optional[Exception]], None]) -> Future:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="save")
+
+        def run() -> None:
+            try:
+                self.save(filename, snapshot)
+            except Exception as e:
+                on_done(filename, e)
+            else:
+                on_done(filename, None)
+
+        return self._executor.submit(run)
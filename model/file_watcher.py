@@ -0,0 +1,93 @@
+import os
+import threading
+from typing import Callable, Dict, Optional
+
+from model.swap_file import Stamp, file_stamp
+
+WATCH_INTERVAL = 0.5  # Секунд между проверками файлов
+TAIL_SIZE = 64  # Сколько последних прочитанных байт сверяется, чтобы отличить дописывание от перезаписи
+
+
+class FileState:
+    """Прочитанная часть файла: размер, mtime и последние байты"""
+
+    def __init__(self, filename: str, size: int, mtime: int, tail: bytes) -> None:
+        self.filename = filename
+        self.size = size
+        self.mtime = mtime
+        self.tail = tail
+
+    @property
+    def stamp(self) -> Stamp:
+        return self.size, self.mtime
+
+    @classmethod
+    def of(cls, filename: str, data: bytes) -> 'FileState':
+        """Состояние после чтения data - всего содержимого файла"""
+        return cls(filename, len(data), os.stat(filename).st_mtime_ns, data[-TAIL_SIZE:])
+
+    @classmethod
+    def read(cls, filename: str) -> 'FileState':
+        with open(filename, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            f.seek(max(0, stat.st_size - TAIL_SIZE))
+            return cls(filename, stat.st_size, stat.st_mtime_ns, f.read(stat.st_size - f.tell()))
+
+    def appended(self) -> Optional[int]:
+        """Сколько байт дописано в конец файла; None - файл изменен иначе (перезаписан, обрезан)"""
+        size, mtime = file_stamp(self.filename)
+        if (size, mtime) == self.stamp:
+            return 0
+        if size < self.size:
+            return None
+        with open(self.filename, 'rb') as f:
+            f.seek(self.size - len(self.tail))
+            if f.read(len(self.tail)) != self.tail:
+                return None
+        return size - self.size
+
+
+class FileWatcher:
+    """Фоновый поток, который опрашивает размер и mtime файлов и сообщает об изменениях.
+
+    callback вызывается в потоке наблюдателя, поэтому обычно только кладет имя файла в очередь.
+    """
+
+    def __init__(self, callback: Callable[[str], None], interval: float = WATCH_INTERVAL) -> None:
+        self.interval = interval
+        self._callback = callback
+        self._files: Dict[str, Stamp] = {}  # Последнее известное состояние файла
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, filename: str, stamp: Stamp) -> None:
+        with self._lock:
+            self._files[filename] = stamp
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="file-watch", daemon=True)
+            self._thread.start()
+
+    def unwatch(self, filename: str) -> None:
+        with self._lock:
+            self._files.pop(filename, None)
+
+    def check(self) -> None:
+        with self._lock:
+            files = list(self._files.items())
+        for filename, known in files:
+            stamp = file_stamp(filename)
+            if stamp == known:
+                continue
+            with self._lock:
+                if self._files.get(filename) != known:
+                    continue  # Пока проверяли, файл перечитали или перестали отслеживать
+                self._files[filename] = stamp
+            self._callback(filename)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def stop(self) -> None:
+        self._stop.set()
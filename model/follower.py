@@ -0,0 +1,107 @@
+import codecs
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from model.file_watcher import TAIL_SIZE, FileState
+
+FOLLOW_INTERVAL = 0.05  # Секунд между чтениями файла
+FOLLOW_FPS = 20  # Не больше стольких обновлений буфера в секунду
+FOLLOW_MAX_LINES = 100000  # Сколько последних строк остается в буфере
+MAX_PENDING = 4 * 1024 * 1024  # Сколько прочитанных байт может ждать главный поток
+
+
+class Follower:
+    """Чтение дописываемого файла в фоновом потоке (как tail -f).
+
+    Поток дочитывает новые байты и декодирует их; главный поток забирает накопленный текст через take
+    не чаще FOLLOW_FPS раз в секунду, поэтому частые мелкие записи в файл дают одну перерисовку.
+    Если файл обрезан или подменен (ротация журнала), чтение начинается с начала нового файла.
+    """
+
+    def __init__(self, state: FileState, max_lines: int = FOLLOW_MAX_LINES,
+                 interval: float = FOLLOW_INTERVAL) -> None:
+        self.filename = state.filename
+        self.max_lines = max_lines
+        self.interval = interval
+        self._offset = state.size
+        self._tail = state.tail
+        self._mtime = state.mtime
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._chunks: List[str] = []
+        self._pending = 0
+        self._reset = False  # Файл начался заново: текст в буфере нужно заменить
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._taken = 0.0
+        self._file = None
+        self._thread = threading.Thread(target=self._run, name="follow", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self._read()
+            except OSError:
+                # Файл временно недоступен (например, между переименованием и созданием нового)
+                self._close_file()
+
+    def _read(self) -> None:
+        if self._pending >= MAX_PENDING:
+            return
+        stat = os.stat(self.filename)
+        if self._file is None:
+            self._file = open(self.filename, 'rb')
+        opened = os.fstat(self._file.fileno())
+        if (stat.st_ino, stat.st_dev) != (opened.st_ino, opened.st_dev) or stat.st_size < self._offset:
+            self._close_file()
+            self._file = open(self.filename, 'rb')
+            self._decoder.reset()
+            with self._lock:
+                self._chunks = []
+                self._pending = 0
+                self._reset = True
+                self._offset = 0
+                self._tail = b""
+        self._file.seek(self._offset)
+        data = self._file.read(MAX_PENDING - self._pending)
+        if not data:
+            return
+        text = self._decoder.decode(data)
+        with self._lock:
+            self._chunks.append(text)
+            self._pending += len(data)
+            self._offset += len(data)
+            self._tail = (self._tail + data)[-TAIL_SIZE:]
+            self._mtime = stat.st_mtime_ns
+
+    def take(self) -> Optional[Tuple[str, bool, FileState]]:
+        """Текст, прочитанный с прошлого раза, признак нового файла и состояние прочитанной части.
+
+        None - нового текста нет или предыдущее обновление было слишком недавно.
+        """
+        now = time.monotonic()
+        if now - self._taken < 1 / FOLLOW_FPS:
+            return None
+        with self._lock:
+            if not self._chunks and not self._reset:
+                return None
+            text = "".join(self._chunks)
+            reset = self._reset
+            state = FileState(self.filename, self._offset, self._mtime, self._tail)
+            self._chunks = []
+            self._pending = 0
+            self._reset = False
+        self._taken = now
+        return text, reset, state
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._close_file()
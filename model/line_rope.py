@@ -0,0 +1,300 @@
+import zlib
+from array import array
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from my_string import my_string as MyString
+from interfaces.ILineSource import ILineSource
+from interfaces.ITextBuffer import ITextBuffer, SnapshotPart
+from model.fenwick import FenwickTree
+from model.file_saver import RawLines
+
+BLOCK_SIZE = 512
+LINE_OVERHEAD = 160  # Примерный размер пустой MyString: объект, массив и кэш str
+CHAR_SIZE = 5  # Символ в массиве (4 байта) плюс в кэшированной str
+OFFSET_SIZE = 8  # Начало строки в индексе отображенного файла
+COMPRESS_LEVEL = 1  # Быстрое сжатие: переключение документов важнее степени сжатия
+
+
+class LazyBlock:
+    """Блок строк, которые еще лежат в источнике (например, в отображенном в память файле)"""
+
+    __slots__ = ('source', 'first', 'count')
+
+    def __init__(self, source: ILineSource, first: int, count: int) -> None:
+        self.source = source
+        self.first = first
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def get_lines(self, start: int, stop: int) -> List[str]:
+        return self.source.get_lines(self.first + start, self.first + stop)
+
+    def get_line_lengths(self, start: int, stop: int) -> Sequence[int]:
+        return self.source.get_line_lengths(self.first + start, self.first + stop)
+
+    def materialize(self) -> List[MyString]:
+        return [MyString(line) for line in self.get_lines(0, self.count)]
+
+
+class PackedBlock:
+    """Блок строк, сжатый zlib: LineRope распаковывает его в обычный блок при первом чтении строк"""
+
+    __slots__ = ('data', 'lengths')
+
+    def __init__(self, lines: List[MyString]) -> None:
+        self.lengths = array('q', (line.size() for line in lines))
+        self.data = zlib.compress('\n'.join(line.c_str() for line in lines).encode('utf-8'), COMPRESS_LEVEL)
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def get_lines(self, start: int, stop: int) -> List[str]:
+        return zlib.decompress(self.data).decode('utf-8').split('\n')[start:stop]
+
+    def get_line_lengths(self, start: int, stop: int) -> Sequence[int]:
+        return self.lengths[start:stop]
+
+    def materialize(self) -> List[MyString]:
+        return [MyString(line) for line in self.get_lines(0, len(self))]
+
+
+Block = Union[List[MyString], LazyBlock, PackedBlock]
+
+
+class LineRope(ITextBuffer):
+    """Строки хранятся блоками, индекс строк - дерево Фенвика по размерам блоков.
+
+    Поиск строки - O(log n), вставка/удаление строк сдвигают только один блок.
+    Блоки из источника (LazyBlock) декодируются при чтении, а в MyString превращаются при правке;
+    сжатые блоки (PackedBlock) распаковываются при первом чтении строк.
+    """
+
+    def __init__(self, lines: Iterable[str] = ("",)) -> None:
+        self._blocks: List[Block] = []
+        self._index = FenwickTree()
+        self._source: Optional[ILineSource] = None  # Источник, пока текст с ним совпадает
+        self.reset(lines)
+
+    def reset(self, lines: Iterable[str]) -> None:
+        blocks: List[Block] = []
+        block = []
+        for line in lines:
+            block.append(MyString(line))
+            if len(block) == BLOCK_SIZE:
+                blocks.append(block)
+                block = []
+        if block or not blocks:
+            blocks.append(block or [MyString("")])
+        self._blocks = blocks
+        self._source = None
+        self._rebuild_index()
+
+    def reset_lazy(self, source: ILineSource) -> None:
+        count = source.get_line_count()
+        self._blocks = [
+            LazyBlock(source, first, min(BLOCK_SIZE, count - first))
+            for first in range(0, count, BLOCK_SIZE)
+        ] or [[MyString("")]]
+        self._source = source
+        self._rebuild_index()
+
+    def source_grew(self) -> None:
+        """Источник дописан в конец: последний блок и новые строки снова берутся из источника,
+        остальные блоки не трогаются"""
+        source = self._source
+        start = self._blocks.pop().first
+        count = source.get_line_count()
+        self._blocks.extend(LazyBlock(source, first, min(BLOCK_SIZE, count - first))
+                            for first in range(start, count, BLOCK_SIZE))
+        self._rebuild_index()
+
+    def _rebuild_index(self) -> None:
+        self._index = FenwickTree(len(block) for block in self._blocks)
+
+    def _locate(self, y: int) -> Tuple[int, int]:
+        if not 0 <= y < self._index.total():
+            raise IndexError(f"line {y} out of range")
+        return self._index.find(y)
+
+    def _loaded(self, block: int) -> List[MyString]:
+        target = self._blocks[block]
+        if not isinstance(target, list):
+            # Блок материализуется только для правки
+            target = self._blocks[block] = target.materialize()
+            self._source = None
+        return target
+
+    def _readable(self, block: int) -> Block:
+        """Блок для чтения строк: сжатый блок распаковывается один раз и дальше хранится как обычный,
+        иначе каждое чтение строки (например, длины при движении курсора) распаковывало бы его целиком"""
+        target = self._blocks[block]
+        if isinstance(target, PackedBlock):
+            target = self._blocks[block] = target.materialize()
+        return target
+
+    def _line(self, y: int) -> MyString:
+        block, offset = self._locate(y)
+        return self._loaded(block)[offset]
+
+    def get_line_count(self) -> int:
+        return self._index.total()
+
+    def get_line(self, y: int) -> str:
+        block, offset = self._locate(y)
+        target = self._readable(block)
+        if not isinstance(target, list):
+            return target.get_lines(offset, offset + 1)[0]
+        return target[offset].c_str()
+
+    def get_line_len(self, y: int) -> int:
+        block, offset = self._locate(y)
+        target = self._readable(block)
+        if not isinstance(target, list):
+            return len(target.get_lines(offset, offset + 1)[0])
+        return target[offset].size()
+
+    def _segments(self, start: int, stop: int, unpack: bool = False) -> Iterator[Tuple[Block, int, int]]:
+        """Куски блоков (блок, начало, конец), покрывающие строки [start, stop); unpack - распаковать сжатые"""
+        start = max(0, start)
+        stop = min(stop, self.get_line_count())
+        if start >= stop:
+            return
+        block, offset = self._locate(start)
+        left = stop - start
+        while left > 0:
+            target = self._readable(block) if unpack else self._blocks[block]
+            end = min(len(target), offset + left)
+            yield target, offset, end
+            left -= end - offset
+            block += 1
+            offset = 0
+
+    def get_lines(self, start: int, stop: int) -> List[str]:
+        result: List[str] = []
+        for target, begin, end in self._segments(start, stop, unpack=True):
+            if not isinstance(target, list):
+                result.extend(target.get_lines(begin, end))
+            else:
+                result.extend(line.c_str() for line in target[begin:end])
+        return result
+
+    def get_line_lengths(self, start: int, stop: int) -> List[int]:
+        """Длины строк; для еще не прочитанных строк - оценка по источнику"""
+        result: List[int] = []
+        for target, begin, end in self._segments(start, stop):
+            if not isinstance(target, list):
+                result.extend(target.get_line_lengths(begin, end))
+            else:
+                result.extend(line.size() for line in target[begin:end])
+        return result
+
+    def iter_lines(self) -> Iterator[str]:
+        for block in self._blocks:
+            if not isinstance(block, list):
+                yield from block.get_lines(0, len(block))
+            else:
+                for line in block:
+                    yield line.c_str()
+
+    def get_source(self) -> Optional[ILineSource]:
+        """Источник текста, если буфер после загрузки не менялся"""
+        return self._source
+
+    def snapshot(self) -> List[SnapshotPart]:
+        """Неизменяемая копия текста для сохранения: непрочитанные блоки копируются из источника как есть"""
+        parts: List[SnapshotPart] = []
+        for block in self._blocks:
+            if isinstance(block, LazyBlock):
+                parts.append(RawLines(block.source, block.first, block.first + block.count))
+            elif isinstance(block, PackedBlock):
+                parts.append(block.get_lines(0, len(block)))
+            else:
+                parts.append([line.c_str() for line in block])
+        return parts
+
+    def memory_size(self) -> int:
+        """Примерный объем памяти: прочитанные строки целиком, непрочитанные - только их смещения в индексе"""
+        size = 0
+        for block in self._blocks:
+            if isinstance(block, LazyBlock):
+                size += block.count * OFFSET_SIZE
+            elif isinstance(block, PackedBlock):
+                size += len(block.data) + block.lengths.itemsize * len(block)
+            else:
+                size += sum(LINE_OVERHEAD + CHAR_SIZE * line.size() for line in block)
+        return size
+
+    def compress(self) -> None:
+        """Сжимает прочитанные блоки; блоки, еще лежащие в источнике, не трогает"""
+        self._blocks = [PackedBlock(block) if isinstance(block, list) else block for block in self._blocks]
+
+    def insert(self, x: int, y: int, text: str) -> Tuple[int, int]:
+        """Вставляет текст (возможно многострочный), возвращает позицию конца вставки"""
+        line = self._line(y)
+        if '\n' not in text:
+            line.insert(x, text)
+            return x + len(text), y
+        parts = text.split('\n')
+        tail = line.split_off(x)
+        line.append(parts[0])
+        tail.insert(0, parts[-1])
+        new_lines = [MyString(part) for part in parts[1:-1]]
+        new_lines.append(tail)
+        self._insert_lines(y + 1, new_lines)
+        return len(parts[-1]), y + len(parts) - 1
+
+    def _insert_lines(self, y: int, lines: List[MyString]) -> None:
+        if y == self.get_line_count():
+            block, offset = len(self._blocks) - 1, len(self._blocks[-1])
+        else:
+            block, offset = self._locate(y)
+        target = self._loaded(block)
+        target[offset:offset] = lines
+        if len(target) > 2 * BLOCK_SIZE:
+            self._blocks[block:block + 1] = [
+                target[i:i + BLOCK_SIZE] for i in range(0, len(target), BLOCK_SIZE)
+            ]
+            self._rebuild_index()
+        else:
+            self._index.add(block, len(lines))
+
+    def delete(self, x0: int, y0: int, x1: int, y1: int) -> str:
+        """Удаляет текст от (x0, y0) до (x1, y1), возвращает удаленный текст"""
+        first = self._line(y0)
+        if y0 == y1:
+            return first.splice(x0, x1 - x0)
+        last = self._line(y1)
+        head = first.split_off(x0).c_str()
+        middle = self.get_lines(y0 + 1, y1)
+        removed_tail = last.splice(0, x1)
+        first.append(last.c_str())
+        self.delete_lines(y0 + 1, y1 + 1)
+        return '\n'.join([head] + middle + [removed_tail])
+
+    def delete_lines(self, start: int, stop: int) -> List[str]:
+        """Удаляет строки [start, stop); в буфере всегда остается хотя бы одна строка"""
+        stop = min(stop, self.get_line_count())
+        if start >= stop:
+            return []
+        removed = self.get_lines(start, stop)
+        self._source = None
+        block, offset = self._locate(start)
+        left = stop - start
+        emptied = False
+        while left > 0:
+            count = min(left, len(self._blocks[block]) - offset)
+            if count == len(self._blocks[block]):
+                # Блок удаляется целиком - читать его из источника не нужно
+                self._blocks[block] = []
+            else:
+                del self._loaded(block)[offset:offset + count]
+            self._index.add(block, -count)
+            emptied = emptied or not self._blocks[block]
+            left -= count
+            block += 1
+            offset = 0
+        if emptied:
+            self._blocks = [target for target in self._blocks if len(target)] or [[MyString("")]]
+            self._rebuild_index()
+        return removed
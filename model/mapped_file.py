@@ -0,0 +1,110 @@
+import mmap
+import os
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, count
+from operator import add, sub
+from typing import List, Sequence, Tuple
+
+from interfaces.ILineSource import ILineSource
+
+INDEX_CHUNK = 4 * 1024 * 1024
+
+
+def decode_line(data: bytes) -> str:
+    """Строка файла: UTF-8 с заменой неверных байт; CR перед переводом строки (CRLF) отбрасывается"""
+    line = data.decode('utf-8', errors='replace')
+    return line[:-1] if line.endswith('\r') else line
+
+
+def split_lines(data: bytes) -> List[str]:
+    """Строки всего файла по тем же правилам, что и строки отображенного файла (decode_line)"""
+    lines = data.decode('utf-8', errors='replace').split('\n')
+    if len(lines) > 1 and not lines[-1]:
+        lines.pop()  # Завершающий перевод строки не начинает новую строку
+    return [line[:-1] if line.endswith('\r') else line for line in lines]
+
+
+class MappedFile(ILineSource):
+    """Файл, отображенный в память: строки декодируются только при обращении к ним"""
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            stat = os.fstat(f.fileno())
+        self.stamp = (stat.st_size, stat.st_mtime_ns)  # По нему видно, что файл на диске изменился
+        self.size = len(self._mm)
+        self._offsets = array('q', [0])
+        self._index_from(0)
+
+    def _index_from(self, start: int) -> None:
+        """Начала строк в байтах [start, size) за один проход: позиции переводов строк считаются
+        итераторами на C, без цикла по строкам"""
+        offsets = self._offsets
+        for pos in range(start, self.size, INDEX_CHUNK):
+            parts = self._mm[pos:pos + INDEX_CHUNK].split(b'\n')
+            # Строка k + 1 начинается сразу за k-м переводом строки: pos + длины частей 0..k + k + 1
+            offsets.extend(map(add, accumulate(map(len, parts[:-1])), count(pos + 1)))
+        # Фиктивное начало строки после последней, чтобы конец строки i был offsets[i + 1] - 1
+        if offsets[-1] != self.size or self.size == 0:
+            offsets.append(self.size + 1)
+
+    def grow(self) -> int:
+        """Файл дописан в конец: отображение обновляется, индексируются только новые байты.
+
+        Возвращает номер первой изменившейся строки (последняя строка могла быть недописана).
+        """
+        with open(self.filename, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            stat = os.fstat(f.fileno())
+        old = self.size
+        self._mm.close()
+        self._mm, self.size = mm, len(mm)
+        self.stamp = (stat.st_size, stat.st_mtime_ns)
+        if self._offsets[-1] == old + 1:
+            # Файл не кончался переводом строки: последняя строка продолжается
+            self._offsets.pop()
+        first = len(self._offsets) - 1
+        self._index_from(old)
+        return first
+
+    def get_line_count(self) -> int:
+        return len(self._offsets) - 1
+
+    def get_line_offset(self, y: int) -> int:
+        return self._offsets[y]
+
+    def line_at(self, offset: int) -> int:
+        """Номер строки, содержащей байт offset"""
+        return bisect_right(self._offsets, offset) - 1
+
+    def position_of(self, offset: int) -> Tuple[int, int]:
+        """Позиция (x, y) символа, который начинается с байта offset"""
+        y = self.line_at(offset)
+        return len(self._mm[self._offsets[y]:offset].decode('utf-8', errors='replace')), y
+
+    def _decode(self, start: int, end: int) -> str:
+        return decode_line(self._mm[start:end])
+
+    def get_line(self, y: int) -> str:
+        return self._decode(self._offsets[y], self._offsets[y + 1] - 1)
+
+    def get_lines(self, start: int, stop: int) -> List[str]:
+        offsets = self._offsets
+        return [self._decode(offsets[y], offsets[y + 1] - 1) for y in range(start, stop)]
+
+    def get_line_lengths(self, start: int, stop: int) -> Sequence[int]:
+        """Длины строк в байтах; для не-ASCII текста это оценка сверху"""
+        offsets = self._offsets
+        return array('q', map(sub, offsets[start + 1:stop + 1], map((1).__add__, offsets[start:stop])))
+
+    def tail(self, size: int) -> bytes:
+        return self._mm[max(0, self.size - size):self.size]
+
+    def get_raw(self, start: int, stop: int) -> bytes:
+        """Байты строк [start, stop) вместе с переводами строк"""
+        end = self._offsets[stop]
+        if end <= self.size:
+            return self._mm[self._offsets[start]:end]
+        return self._mm[self._offsets[start]:self.size] + b'\n'
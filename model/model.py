@@ -1,11 +1,28 @@
-from typing import List, Tuple, Any
-from my_string import my_string as MyString
+import os
+import queue
+from typing import List, Tuple, Any, Callable, Optional
 from abc import ABC, abstractmethod
 from event_manager import EventManager
 from interfaces.ICursor import ICursor
 from interfaces.IModel import IModel
+from interfaces.ITextBuffer import ITextBuffer
 from interfaces.event_listener import EventListener
+from model.buffer_list import BufferList, Document
 from model.cursor import Cursor
+from model.damage import Damage
+from model.file_saver import FileSaver
+from model.file_watcher import TAIL_SIZE, FileState, FileWatcher
+from model.follower import FOLLOW_MAX_LINES, Follower
+from model.line_rope import LineRope
+from model.mapped_file import MappedFile, split_lines
+from model.parallel_search import ParallelSearch
+from model.search_index import SearchIndex, spans_lines
+from model.swap_file import JournalFlusher, SwapJournal, file_stamp, read_swap
+from model.undo import UndoJournal, text_end
+
+MMAP_THRESHOLD = 8 * 1024 * 1024
+INDENT = "    "
+PARALLEL_SEARCH_THRESHOLD = 256 * 1024 * 1024
 
 
 class Observer(ABC):
@@ -15,22 +32,36 @@ class Observer(ABC):
 
 
 class Model(IModel):
-    def __init__(self) -> None:
-        self._lines: List[MyString] = [MyString("")]
+    def __init__(self, buffer: Optional[ITextBuffer] = None) -> None:
+        self._buffer: ITextBuffer = buffer if buffer is not None else LineRope()
+        self._line_count = self._buffer.get_line_count()
         self._observers: List[Observer] = []
         self._cursor: ICursor = Cursor()
         self._event_manager = EventManager()
         self.command_buf = ""
+        self.notice = ""  # Сообщение в строке состояния обычного режима (например, о файле на диске)
         self.status = "normal"
         self.modify = False
         self.search = False
+        self._version = 0  # Счетчик правок: по нему видно, менялся ли текст после снимка
+        self._saver = FileSaver()
+        self._search_index = SearchIndex()
+        self._parallel_search = ParallelSearch()
+        self._undo = UndoJournal()
+        self._selection: Optional[Tuple[int, int, bool]] = None  # Начало выделения (x, y) и построчный ли режим
+        self._finished_saves: queue.Queue = queue.Queue()  # Итоги фоновых сохранений для главного потока
+        # Открытые файлы; поля выше принадлежат текущему документу и сохраняются в нем при переключении
+        self._documents = BufferList(Document("", self._buffer, self._cursor, self._undo))
+        self._flusher = JournalFlusher()  # Фоновая запись журналов правок (swap-файлов)
+        self._file_changes: queue.Queue = queue.Queue()  # Файлы, изменившиеся на диске
+        self._watcher = FileWatcher(self._file_changes.put)
 
     def get_len(self) -> int:
-        return len(self._lines)
+        return self._buffer.get_line_count()
 
     def move_cursor(self, x: int, y: int) -> None:
         # print(str(x) + " " + str(y))
-        self._cursor.move_cursor(x, y, self._lines)
+        self._cursor.move_cursor(x, y, self._buffer)
         self.notify_observers("cursor_moved")
 
     def set_command_buf(self, text: str) -> None:
@@ -39,6 +70,13 @@ class Model(IModel):
     def get_command_buf(self) -> str:
         return self.command_buf
 
+    def set_notice(self, text: str) -> None:
+        self.notice = text
+        self.notify_observers("status_changed")
+
+    def get_notice(self) -> str:
+        return self.notice
+
     def set_status(self, text: str):
         self.status = text
 
@@ -51,6 +89,26 @@ class Model(IModel):
     def set_cursor_pos(self, x: int, y: int) -> None:
         self._cursor.set_pos(x, y)
 
+    def go_to_line(self, line: int) -> None:
+        """Переходит на строку line (нумерация с 1); номер за пределами файла прижимается к первой или последней
+        строке. Строка находится по индексу блоков, поэтому переход не зависит от того, прочитан ли файл"""
+        y = min(max(line, 1), self._buffer.get_line_count()) - 1
+        self._cursor.set_pos(0, y)
+        self.notify_observers("cursor_moved")
+
+    def go_to_percent(self, percent: int) -> None:
+        """Переходит на строку, стоящую на percent процентах файла (N% в vim)"""
+        percent = min(max(percent, 0), 100)
+        self.go_to_line((percent * self._buffer.get_line_count() + 99) // 100)
+
+    def file_info(self) -> str:
+        """Имя файла, число строк и положение курсора в процентах (Ctrl-G)"""
+        count = self._buffer.get_line_count()
+        y = self._cursor.get_pos()[1]
+        name = self.get_filename() or "[No Name]"
+        modified = " [Modified]" if self.modify else ""
+        return f'"{name}"{modified} {count} lines --{(y + 1) * 100 // count}%--'
+
     def get_modify(self) -> bool:
         return self.modify
 
@@ -60,7 +118,7 @@ class Model(IModel):
     def get_word_info(self):
         now_x, now_y = self.get_cursor_pos()
         i = j = now_x
-        line = self._lines[now_y].c_str()
+        line = self._buffer.get_line(now_y)
         while i > 0 and line[i] != ' ':
             i -= 1
         while j < len(line) and line[j] != ' ':
@@ -69,13 +127,70 @@ class Model(IModel):
             return -1, -1
         return i, j
 
-    def replace(self, char: str) -> None:
+    def _insert(self, x: int, y: int, text: str) -> Tuple[int, int]:
+        """Вставка с записью в журнал отмены и в swap-файл"""
+        self._undo.record(x, y, "", text, self._cursor.get_pos())
+        self._journal_edit(x, y, x, y, text)
+        return self._buffer.insert(x, y, text)
+
+    def _delete(self, x0: int, y0: int, x1: int, y1: int) -> str:
+        """Удаление с записью в журнал отмены и в swap-файл"""
+        removed = self._buffer.delete(x0, y0, x1, y1)
+        self._undo.record(x0, y0, removed, "", self._cursor.get_pos())
+        self._journal_edit(x0, y0, x1, y1, "")
+        return removed
+
+    def _journal_edit(self, x0: int, y0: int, x1: int, y1: int, text: str) -> None:
+        journal = self._documents.current.journal
+        if journal is not None:
+            journal.record(x0, y0, x1, y1, text)
+
+    def begin_change(self) -> None:
+        """Правки до end_change отменяются одной командой (например, весь сеанс ввода)"""
+        self._undo.begin(self._cursor.get_pos())
+
+    def end_change(self) -> None:
+        self._undo.end()
+
+    def _swap_text(self, x: int, y: int, old: str, new: str) -> None:
+        """Заменяет текст old в позиции (x, y) на new без записи в журнал отмены"""
+        end_x, end_y = text_end(x, y, old)
+        self._buffer.delete(x, y, end_x, end_y)
+        self._buffer.insert(x, y, new)
+        self._journal_edit(x, y, end_x, end_y, new)
+        self._text_changed(y, end_y + 1)
+
+    def undo(self) -> None:
+        group = self._undo.undo()
+        if group is None:
+            return
+        for change in reversed(group.changes):
+            self._swap_text(change.x, change.y, change.inserted, change.removed)
+        self.modify = True
+        self.set_cursor_pos(*group.cursor)
+        self.notify_observers("cursor_moved")
+
+    def redo(self) -> None:
+        group = self._undo.redo()
+        if group is None:
+            return
+        for change in group.changes:
+            self._swap_text(change.x, change.y, change.removed, change.inserted)
         self.modify = True
+        self.set_cursor_pos(group.changes[0].x, group.changes[0].y)
+        self.notify_observers("cursor_moved")
+
+    def replace(self, char: str, count: int = 1) -> None:
+        """Заменяет count символов начиная с курсора символом char; если символов меньше count, ничего не делает"""
         now_x, now_y = self.get_cursor_pos()
-        now_line = self._lines[now_y]
-        now_line.replace(now_x, 1, char)
-        self._lines[now_y] = now_line
-        self.notify_observers("text_changed")
+        if now_x + count > self._buffer.get_line_len(now_y):
+            return
+        self.modify = True
+        self.begin_change()
+        self._delete(now_x, now_y, now_x + count, now_y)
+        self._insert(now_x, now_y, char * count)
+        self.end_change()
+        self._text_changed(now_y, now_y + 1)
 
     def str_to_start(self) -> None:
         now_x, now_y = self.get_cursor_pos()
@@ -84,13 +199,11 @@ class Model(IModel):
 
     def str_to_end(self) -> None:
         now_x, now_y = self.get_cursor_pos()
-        now_line = self._lines[now_y].c_str()
-        self.set_cursor_pos(len(now_line), now_y)
+        self.set_cursor_pos(self._buffer.get_line_len(now_y), now_y)
         self.notify_observers("cursor_moved")
 
     def word_to_end(self) -> None:
         now_x, now_y = self.get_cursor_pos()
-        now_line = self._lines[now_y]
         word_a, word_b = self.get_word_info()
         if word_b != -1:
             self.set_cursor_pos(word_b, now_y)
@@ -98,22 +211,97 @@ class Model(IModel):
 
     def word_to_start(self) -> None:
         now_x, now_y = self.get_cursor_pos()
-        now_line = self._lines[now_y]
         word_a, word_b = self.get_word_info()
         if word_a != -1:
             self.set_cursor_pos(word_a + 1, now_y)
             self.notify_observers("cursor_moved")
 
-    def delete_str(self) -> None:
+    def line_span(self, start: int, stop: int) -> Tuple[int, int, int, int]:
+        """Диапазон (x0, y0, x1, y1), удаление которого убирает строки [start, stop) вместе с переводом строки"""
+        last_len = self._buffer.get_line_len(stop - 1)
+        if stop < self._buffer.get_line_count():
+            return 0, start, 0, stop
+        if start > 0:
+            return self._buffer.get_line_len(start - 1), start - 1, last_len, stop - 1
+        return 0, start, last_len, stop - 1
+
+    def delete_str(self, count: int = 1) -> None:
+        """Удаляет count строк начиная с текущей одной правкой буфера"""
         self.modify = True
         now_x, now_y = self.get_cursor_pos()
-        now_line = self._lines.pop(now_y)
-        self.notify_observers("text_changed")
+        stop = min(now_y + count, self._buffer.get_line_count())
+        self._delete(*self.line_span(now_y, stop))
+        self.set_cursor_pos(0, min(now_y, self._buffer.get_line_count() - 1))
+        self._text_changed(now_y, stop)
+
+    def get_range(self, x0: int, y0: int, x1: int, y1: int) -> str:
+        """Текст от (x0, y0) до (x1, y1), конец не включается"""
+        lines = self._buffer.get_lines(y0, y1 + 1)
+        if y0 == y1:
+            return lines[0][x0:x1]
+        lines[0] = lines[0][x0:]
+        lines[-1] = lines[-1][:x1]
+        return '\n'.join(lines)
+
+    def delete_range(self, x0: int, y0: int, x1: int, y1: int) -> str:
+        """Удаляет текст от (x0, y0) до (x1, y1) одной правкой и возвращает его"""
+        self.modify = True
+        removed = self._delete(x0, y0, x1, y1)
+        self.set_cursor_pos(x0, y0)
+        self._text_changed(y0, y1 + 1)
+        return removed
 
-    def delete_word(self) -> None:
+    def _rewrite_range(self, x0: int, y0: int, x1: int, y1: int, text: str) -> None:
+        """Заменяет диапазон текстом одной группой отмены и одним уведомлением"""
+        self.modify = True
+        self.begin_change()
+        self._delete(x0, y0, x1, y1)
+        self._insert(x0, y0, text)
+        self.end_change()
+        self._text_changed(y0, y1 + 1)
+
+    def replace_range(self, x0: int, y0: int, x1: int, y1: int, char: str) -> None:
+        """Заменяет каждый символ диапазона (кроме переводов строк) символом char"""
+        old = self.get_range(x0, y0, x1, y1)
+        self._rewrite_range(x0, y0, x1, y1, '\n'.join(char * len(line) for line in old.split('\n')))
+        self.set_cursor_pos(x0, y0)
+
+    def indent_range(self, y0: int, y1: int, shift: int) -> None:
+        """Сдвигает строки [y0, y1] на shift отступов вправо (отрицательный shift - влево)"""
+        lines = self._buffer.get_lines(y0, y1 + 1)
+        if shift > 0:
+            lines = [INDENT * shift + line if line else line for line in lines]
+        else:
+            width = len(INDENT) * -shift
+            lines = [line[min(width, len(line) - len(line.lstrip(' '))):] for line in lines]
+        self._rewrite_range(0, y0, self._buffer.get_line_len(y1), y1, '\n'.join(lines))
+        self.set_cursor_pos(0, y0)
+
+    def start_selection(self, linewise: bool) -> None:
+        x, y = self.get_cursor_pos()
+        self._selection = (x, y, linewise)
+        self.notify_observers("status_changed")
+
+    def clear_selection(self) -> None:
+        self._selection = None
+        self.notify_observers("status_changed")
+
+    def get_selection(self) -> Optional[Tuple[int, int, int, int, bool]]:
+        """Выделение (x0, y0, x1, y1, построчно) от начала до конца, конец не включается"""
+        if self._selection is None:
+            return None
+        ax, ay, linewise = self._selection
+        cx, cy = self.get_cursor_pos()
+        (x0, y0), (x1, y1) = sorted([(ax, ay), (cx, cy)], key=lambda pos: (pos[1], pos[0]))
+        if linewise:
+            return 0, y0, self._buffer.get_line_len(y1), y1, True
+        return x0, y0, min(x1 + 1, self._buffer.get_line_len(y1)), y1, False
+
+    def delete_word(self, count: int = 1) -> None:
+        """Удаляет count слов начиная со слова под курсором (в пределах строки)"""
         self.modify = True
         x, now_y = self.get_cursor_pos()
-        s = self._lines[now_y].c_str()
+        s = self._buffer.get_line(now_y)
         if x < 0 or x >= len(s) or s[x] == " ":
             return
         start = x
@@ -124,27 +312,39 @@ class Model(IModel):
             end += 1
         if end < len(s) and s[end] == " ":
             end += 1
-        new_str = s[:start] + s[end:]
-        self._lines[now_y] = MyString(new_str)
+        for _ in range(count - 1):
+            while end < len(s) and s[end] != " ":
+                end += 1
+            if end < len(s) and s[end] == " ":
+                end += 1
+        self._delete(start, now_y, end, now_y)
+        self._text_changed(now_y, now_y + 1)
 
     def copy_word(self) -> str:
         now_x, now_y = self.get_cursor_pos()
         begin_word_pos, end_word_pos = self.get_word_info()
-        line = self._lines[now_y]
-        return line.substr(begin_word_pos, end_word_pos - begin_word_pos).c_str()
+        return self._buffer.get_line(now_y)[begin_word_pos:end_word_pos]
 
-    def copy_str(self) -> str:
+    def copy_str(self, count: int = 1) -> str:
         now_x, now_y = self.get_cursor_pos()
-        return self._lines[now_y].c_str()
+        return '\n'.join(self._buffer.get_lines(now_y, now_y + count))
 
-    def paste(self, copy_buffer: str) -> None:
+    def paste(self, copy_buffer: str, count: int = 1) -> None:
         self.modify = True
         now_x, now_y = self.get_cursor_pos()
-        line = self._lines[now_y]
-        line.insert(now_x, str(copy_buffer))
-        self._lines[now_y] = line
+        self._insert(now_x, now_y, str(copy_buffer) * count)
         self.set_cursor_pos(now_x, now_y)
-        self.notify_observers("text_changed")
+        self._text_changed(now_y, now_y + 1)
+
+    def insert_text(self, text: str) -> None:
+        """Вставляет блок текста в позицию курсора одной правкой буфера; курсор - в конец вставки"""
+        if not text:
+            return
+        self.modify = True
+        x, y = self._cursor.get_pos()
+        end_x, end_y = self._insert(x, y, text)
+        self._cursor.set_pos(end_x, end_y)
+        self._text_changed(y, y + 1)
 
     def page_up(self, rows: int) -> None:
         now_x, now_y = self.get_cursor_pos()
@@ -156,7 +356,7 @@ class Model(IModel):
     def page_down(self, rows: int) -> None:
         now_x, now_y = self.get_cursor_pos()
         new_y = now_y + rows
-        new_y = min(len(self._lines) - 1, new_y)
+        new_y = min(self._buffer.get_line_count() - 1, new_y)
         self._cursor.set_pos(0, new_y)
         self.notify_observers("cursor_moved")
 
@@ -167,29 +367,39 @@ class Model(IModel):
     def notify_observers(self, event_type: str, data: Any = None) -> None:
         self._event_manager.notify(self, event_type, data)
 
+    def _text_changed(self, start: int, stop: int) -> None:
+        """Сообщает, что старые строки [start, stop) заменены новыми"""
+        delta = self._buffer.get_line_count() - self._line_count
+        self._line_count += delta
+        self._version += 1
+        damage = Damage(start, stop + delta, delta)
+        self._search_index.invalidate(self._buffer, damage)
+        self.notify_observers("text_changed", damage)
+
     def get_data(self) -> Tuple[List[str], Tuple[int, int]]:
         cursor_pos = self._cursor.get_pos()
-        return [line.c_str() for line in self._lines], cursor_pos
+        return self._buffer.get_lines(0, self._buffer.get_line_count()), cursor_pos
+
+    def get_line(self, y: int) -> str:
+        return self._buffer.get_line(y)
+
+    def get_lines(self, start: int, stop: int) -> List[str]:
+        return self._buffer.get_lines(start, stop)
+
+    def get_line_lengths(self, start: int, stop: int) -> List[int]:
+        return self._buffer.get_line_lengths(start, stop)
 
     def insert_char(self, char: str) -> None:
         self.modify = True
         x, y = self._cursor.get_pos()
-        current_line = self._lines[y]
+        self._insert(x, y, char)
 
         if char == '\n':
-            left_part = current_line.substr(0, x)
-            right_part = current_line.substr(x)
-
-            self._lines[y] = MyString(left_part)
-            self._lines.insert(y + 1, MyString(right_part))
-
             self._cursor.set_pos(0, y + 1)
+            self._text_changed(y, y + 1)
         else:
-            new_content = current_line.substr(0, x) + char + current_line.substr(x)
-            self._lines[y] = MyString(new_content)
-            self._cursor.move_cursor(1, 0, self._lines)
-
-        self.notify_observers("text_changed")
+            self._cursor.move_cursor(1, 0, self._buffer)
+            self._text_changed(y, y + 1)
 
     def delete_char(self) -> None:
         self.modify = True
@@ -198,91 +408,494 @@ class Model(IModel):
             return
 
         if x == 0:
-            prev_line = self._lines[y - 1]
-            current_line = self._lines[y]
+            prev_len = self._buffer.get_line_len(y - 1)
+            self._delete(prev_len, y - 1, 0, y)
 
-            merged_content = prev_line.substr(0) + current_line.substr(0)
-            self._lines[y - 1] = MyString(merged_content)
-            del self._lines[y]
-
-            self._cursor.set_pos(len(prev_line), y - 1)
+            self._cursor.set_pos(prev_len, y - 1)
             #self.move_cursor(-1, len(prev_line))
+            self._text_changed(y - 1, y + 1)
         else:
-            current_line = self._lines[y]
-            new_content = current_line.substr(0, x - 1) + current_line.substr(x)
-            self._lines[y] = MyString(new_content)
-            self._cursor.move_cursor(-1, 0, self._lines)
+            self._delete(x - 1, y, x, y)
+            self._cursor.move_cursor(-1, 0, self._buffer)
+            self._text_changed(y, y + 1)
 
-        self.notify_observers("text_changed")
-
-    def delete_char_inv(self) -> None:
+    def delete_char_inv(self, count: int = 1) -> None:
         self.modify = True
         x, y = self._cursor.get_pos()
-        current_line = self._lines[y] if y < len(self._lines) else None
+        line_count = self._buffer.get_line_count()
+        current_len = self._buffer.get_line_len(y) if y < line_count else 0
 
-        if y >= len(self._lines) or (x == len(current_line) and y == len(self._lines) - 1):
+        if y >= line_count or (x == current_len and y == line_count - 1):
             return
 
-        if x == len(current_line):
-            next_line = self._lines[y + 1]
-            merged_content = current_line.substr(0) + next_line.substr(0)
-            self._lines[y] = MyString(merged_content)
-            del self._lines[y + 1]
-        else:
-            new_content = current_line.substr(0, x + 1) + current_line.substr(x + 2)
-            self._lines[y] = MyString(new_content)
-
         self._cursor.set_pos(x, y)
-        self.notify_observers("text_changed")
-
-    def save_file(self, filename: str) -> None:
+        if x == current_len:
+            self._delete(x, y, 0, y + 1)
+            self._text_changed(y, y + 2)
+        else:
+            if x + 1 < current_len:
+                self._delete(x + 1, y, min(x + 1 + count, current_len), y)
+            self._text_changed(y, y + 1)
+
+    def save_file(self, filename: str, background: bool = False, force: bool = False,
+                  rename: bool = False) -> None:
+        """Сохраняет файл атомарно; при background=True пишет снимок текста в фоновом потоке.
+
+        По завершении рассылается событие file_saved: data - имя файла или исключение при ошибке.
+        Буфер, в котором :follow оставил только конец файла, записывается поверх этого файла только при force.
+        При rename документ после успешной записи получает имя filename.
+        """
+        disk = self._documents.current.disk
+        if self._documents.current.partial and not force and disk is not None and \
+                os.path.abspath(filename) == os.path.abspath(disk.filename):
+            raise RuntimeError(f"buffer holds only the last lines of {filename}, use :w! to overwrite it")
+        snapshot = self._buffer.snapshot()
+        version = self._version
+        document = self._documents.current
+        mark = document.journal.mark() if document.journal is not None else 0
+        if background:
+            self._saver.save_async(
+                filename, snapshot,
+                lambda name, error: self._finished_saves.put((document, name, error, version, mark, rename)))
+            return
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                for line in self._lines:
-                    content = line.c_str()
-                    f.write(content + '\n')
-            self.modify = False
+            self._saver.save(filename, snapshot)
         except Exception as e:
+            self._save_finished(document, filename, e, version, mark, rename)
             raise RuntimeError(f"Save error: {str(e)}")
+        self._save_finished(document, filename, None, version, mark, rename)
+
+    def _save_finished(self, document: Document, filename: str, error: Optional[Exception],
+                       version: int, mark: int, rename: bool) -> None:
+        if error is not None:
+            if document.journal is not None:
+                document.journal.cancel()
+            # Документ остается измененным и со старым именем - пользователь должен узнать почему
+            self.set_notice(f"E212: Can't open file for writing: {filename} ({error})")
+            self.notify_observers("file_saved", RuntimeError(f"Save error: {str(error)}"))
+            return
+        if rename:
+            document.filename = filename
+        if document.filename == filename:
+            document.trimmed = 0  # Файл теперь совпадает с буфером
+        self._journal_saved(document, filename, mark)
+        if document.filename == filename:
+            try:
+                self._watch(document, FileState.read(filename))
+            except OSError:
+                pass
+        if document is not self._documents.current:
+            # Пока шла запись, пользователь переключился на другой документ
+            if version == document.version:
+                document.modify = False
+        elif version == self._version:
+            self.modify = False
+        self.notify_observers("file_saved", filename)
+
+    def poll_events(self) -> None:
+        """Рассылает события, пришедшие из фоновых потоков; вызывается из главного цикла"""
+        while True:
+            try:
+                document, filename, error, version, mark, rename = self._finished_saves.get_nowait()
+            except queue.Empty:
+                break
+            self._save_finished(document, filename, error, version, mark, rename)
+        while True:
+            try:
+                filename = self._file_changes.get_nowait()
+            except queue.Empty:
+                break
+            self._file_changed(filename)
+        for document in self._documents.documents:
+            if document.follower is not None:
+                self._poll_follow(document)
+
+    def _watch(self, document: Document, state: FileState) -> None:
+        document.disk = state
+        self._watcher.watch(state.filename, state.stamp)
+
+    def _file_changed(self, filename: str) -> None:
+        """Файл изменился на диске: дописанное в конец неизмененного документа добавляется в буфер"""
+        document = next((document for document in self._documents.documents
+                         if document.disk is not None and document.disk.filename == filename), None)
+        if document is None:
+            self._watcher.unwatch(filename)
+            return
+        if document.buffer is None or document.follower is not None:
+            # Выгруженный документ перечитывается при возврате к нему, в режиме :follow файл дочитывает Follower
+            return
+        try:
+            appended = document.disk.appended()
+        except OSError:
+            return  # Файл удален или недоступен - текст в буфере остается
+        current = document is self._documents.current
+        if not appended:
+            if appended is None and current:
+                self.set_notice(f"{filename} changed on disk, :e! to reload")
+            return
+        modified = self.modify if current else document.modify
+        if modified:
+            if current:
+                self.set_notice(f"{filename} grew on disk, :e! to reload")
+            return
+        old_count = document.buffer.get_line_count()
+        try:
+            self._append_from_disk(document)
+        except OSError:
+            return
+        if document.journal is not None:
+            document.journal.reset(document.disk.stamp, document.trimmed)
+        if current:
+            self._text_changed(old_count - 1, old_count)
+
+    def _append_from_disk(self, document: Document) -> None:
+        """Дочитывает дописанные байты, не перечитывая начало файла"""
+        buffer, disk = document.buffer, document.disk
+        source = buffer.get_source()
+        if isinstance(source, MappedFile):
+            source.grow()
+            buffer.source_grew()
+            self._watch(document, FileState(disk.filename, source.size, source.stamp[1], source.tail(TAIL_SIZE)))
+            return
+        with open(disk.filename, 'rb') as f:
+            f.seek(disk.size)
+            data = f.read()
+            mtime = os.fstat(f.fileno()).st_mtime_ns
+        self._append_text(buffer, data.decode('utf-8', errors='replace'), disk.tail)
+        self._watch(document, FileState(disk.filename, disk.size + len(data), mtime, (disk.tail + data)[-TAIL_SIZE:]))
+
+    @staticmethod
+    def _append_text(buffer: ITextBuffer, text: str, tail: bytes) -> None:
+        """Добавляет в конец буфера текст, дописанный в файл после байт tail"""
+        text = text.replace('\r\n', '\n')
+        # Завершающий перевод строки не дает новой строки, а перевод строки в конце прежнего текста - дает
+        if text.endswith('\n'):
+            text = text[:-1]
+        if tail.endswith(b'\n'):
+            text = '\n' + text
+        last = buffer.get_line_count() - 1
+        buffer.insert(buffer.get_line_len(last), last, text)
+
+    def follow(self, max_lines: int = FOLLOW_MAX_LINES) -> None:
+        """Показывает дописываемый файл как tail -f: новые строки добавляются в конец буфера,
+        в буфере остаются только последние max_lines строк. Измененный буфер не отслеживается"""
+        document = self._documents.current
+        if document.disk is None:
+            raise RuntimeError("No file to follow")
+        if max_lines < 1:
+            raise RuntimeError("Line limit must be positive")
+        if self.modify:
+            # Начало буфера будет отброшено вместе с правками, а журнал отмены очищен
+            raise RuntimeError("No write since last change, :w first")
+        self.unfollow()
+        document.follower = Follower(document.disk, max_lines)
+        self._cursor.set_pos(0, self._buffer.get_line_count() - 1)
+        self._trim_history(document)
+        if document.journal is not None:
+            document.journal.reset(document.disk.stamp, document.trimmed)
+        self.notify_observers("cursor_moved")
+
+    def unfollow(self) -> None:
+        document = self._documents.current
+        if document.follower is not None:
+            self._stop_follow(document)
+
+    def _stop_follow(self, document: Document, notice: str = "") -> None:
+        document.follower.stop()
+        document.follower = None
+        if document is self._documents.current:
+            self.set_notice(notice)
+
+    def is_following(self) -> bool:
+        return self._documents.current.follower is not None
+
+    def _poll_follow(self, document: Document) -> None:
+        """Добавляет в буфер текст, прочитанный в фоне с прошлого кадра"""
+        taken = document.follower.take()
+        if taken is None:
+            return
+        text, reset, state = taken
+        current = document is self._documents.current
+        modified = self.modify if current else document.modify
+        if modified:
+            # Дочитанный текст не смешивается с несохраненными правками и их журналом
+            self._stop_follow(document, f"{state.filename} changed on disk, buffer is modified: follow stopped")
+            return
+        buffer, cursor = document.buffer, document.cursor
+        if reset:
+            # Файл обрезан или заменен новым - показываем его с начала
+            old_count = buffer.get_line_count()
+            buffer.reset(("",))
+            document.undo.clear()
+            cursor.set_pos(0, 0)
+            document.trimmed = 0
+            if current:
+                self._text_changed(0, old_count)
+            tail = b""
+        else:
+            tail = document.disk.tail
+        old_count = buffer.get_line_count()
+        at_end = cursor.get_pos()[1] == old_count - 1
+        self._append_text(buffer, text, tail)
+        self._watch(document, state)
+        if current:
+            self._text_changed(old_count - 1, old_count)
+        if at_end:
+            # Курсор на последней строке - экран прокручивается вслед за новыми строками
+            cursor.set_pos(0, buffer.get_line_count() - 1)
+        self._trim_history(document)
+        if document.journal is not None:
+            # Правки в журнале будут отсчитываться от первой оставшейся в буфере строки файла
+            document.journal.reset(state.stamp, document.trimmed)
+        if current:
+            self.notify_observers("cursor_moved")
 
-    def load_file(self, filename: str) -> None:
+    def _trim_history(self, document: Document) -> None:
+        """Удаляет самые старые строки сверх предела; удаляется сразу восьмая часть предела,
+        чтобы строки не удалялись в каждом кадре"""
+        buffer, cursor = document.buffer, document.cursor
+        max_lines = document.follower.max_lines
+        count = buffer.get_line_count()
+        if count <= max_lines:
+            return
+        trimmed = count - max_lines + max_lines // 8
+        buffer.delete_lines(0, trimmed)
+        document.trimmed += trimmed
+        # Правки в журнале отмены ссылаются на удаленные строки
+        document.undo.clear()
+        x, y = cursor.get_pos()
+        cursor.set_pos(x if y >= trimmed else 0, max(0, y - trimmed))
+        if document is self._documents.current:
+            self._selection = None
+            self._text_changed(0, trimmed)
+        else:
+            document.selection = None
+
+    def _journal_saved(self, document: Document, filename: str, mark: int) -> None:
+        """Файл записан: журнал документа начинается заново от него (и переезжает, если файл другой)"""
+        journal = document.journal
+        if journal is None:
+            if document.filename == filename:
+                self._open_journal(document, filename)
+        elif document.filename == filename:
+            journal.saved(mark, file_stamp(filename), filename)
+        else:
+            journal.cancel()
+
+    def _open_journal(self, document: Document, filename: str) -> None:
+        if document.journal is not None:
+            document.journal.discard()
+            self._flusher.remove(document.journal)
+        document.journal = SwapJournal(filename, file_stamp(filename))
+        self._flusher.add(document.journal)
+
+    @staticmethod
+    def _read_file(buffer: ITextBuffer, filename: str, mapped: Optional[bool] = None) -> FileState:
+        """Читает файл в буфер; возвращает состояние прочитанного файла для отслеживания изменений"""
+        size = os.path.getsize(filename)
+        if mapped is None:
+            mapped = size >= MMAP_THRESHOLD
+        if mapped and size > 0:
+            source = MappedFile(filename)
+            buffer.reset_lazy(source)
+            return FileState(filename, source.size, source.stamp[1], source.tail(TAIL_SIZE))
+        with open(filename, 'rb') as f:
+            data = f.read()
+        # Те же правила декодирования и переводов строк, что и у отображенного файла
+        buffer.reset(split_lines(data))
+        return FileState.of(filename, data)
+
+    def load_file(self, filename: str, mapped: Optional[bool] = None) -> None:
+        """Загружает файл; большие файлы (или при mapped=True) отображаются в память и читаются лениво"""
+        self.unfollow()
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                self._lines = [
-                    MyString(line.rstrip('\n'))
-                    for line in f.readlines()
-                ]
-                if not self._lines:
-                    self._lines = [MyString("")]
-                self._cursor.set_pos(0, 0)
-                self.notify_observers("text_changed")
+            state = self._read_file(self._buffer, filename, mapped)
+            self._documents.current.trimmed = 0
+            self._open_journal(self._documents.current, filename)
+            self._watch(self._documents.current, state)
+            self._cursor.set_pos(0, 0)
+            self._undo.clear()
+            self._text_changed(0, self._line_count)
             self.modify = False
         except FileNotFoundError:
             raise RuntimeError(f"File not found: {filename}")
         except Exception as e:
             raise RuntimeError(f"Load error: {str(e)}")
 
-    def search_string(self, word: str, forward: bool):
-        if not self._lines or not word:
+    def get_filename(self) -> str:
+        return self._documents.current.filename
+
+    def set_filename(self, filename: str) -> None:
+        self._documents.current.filename = filename
+
+    def reload_file(self) -> None:
+        """Перечитывает файл, отбрасывая несохраненные правки; курсор остается на той же строке"""
+        disk = self._documents.current.disk
+        filename = disk.filename if disk is not None else self.get_filename()
+        if not filename:
+            raise RuntimeError("No file name")
+        y = self._cursor.get_pos()[1]
+        self.load_file(filename)
+        self.set_cursor_pos(0, min(y, self._buffer.get_line_count() - 1))
+
+    def edit_file(self, filename: str) -> None:
+        """Переключается на документ с файлом filename, открывая его при необходимости"""
+        index = self._documents.find(filename)
+        if index is None:
+            document = Document(filename, LineRope(), Cursor(), UndoJournal())
+            if os.path.exists(filename):
+                try:
+                    self._watch(document, self._read_file(document.buffer, filename))
+                except Exception as e:
+                    raise RuntimeError(f"Load error: {str(e)}")
+            self._open_journal(document, filename)
+            index = self._documents.add(document)
+        self._switch_document(index)
+
+    def next_buffer(self) -> None:
+        self._switch_document(self._documents.active + 1)
+
+    def prev_buffer(self) -> None:
+        self._switch_document(self._documents.active - 1)
+
+    def list_buffers(self) -> List[Tuple[str, bool, bool, str]]:
+        """Открытые документы: (имя файла, текущий ли, изменен ли, где лежит текст)"""
+        current = self._documents.current
+        return [(document.filename, document is current, self.modify if document is current else document.modify,
+                 document.state) for document in self._documents.documents]
+
+    def _switch_document(self, index: int) -> None:
+        documents = self._documents
+        if index % len(documents.documents) == documents.active:
             return
-        now_len = len(self._lines)
-        now_x, now_y = self._cursor.get_pos()
-        start_y = now_y + (1 if forward else -1)
-        range_y = range(start_y, now_len) if forward else range(start_y, -1, -1)
-        line = self._lines[now_y].c_str()
-        line_left = line[:now_x]
-        line_right = line[now_x + 1:]
-        pos = line_right.find(word) if forward else line_left.rfind(word)
-        if pos != -1:
-            self.set_cursor_pos(pos+len(line_left)+1, now_y) if forward else self.set_cursor_pos(pos, now_y)
-            return
-        for y in range_y:
-            line = self._lines[y].c_str()
-            pos = line.find(word) if forward else line.rfind(word)
+        target = documents.documents[index % len(documents.documents)]
+        if target.buffer is None:
+            self._restore_document(target)
+        current = documents.current
+        self._undo.end_all()
+        current.version = self._version
+        current.modify = self.modify
+        current.selection = self._selection
+
+        document = documents.select(index)
+        self._buffer = document.buffer
+        self._cursor = document.cursor
+        self._undo = document.undo
+        self._version = document.version
+        self.modify = document.modify
+        self._selection = document.selection
+        self._cursor.move_cursor(0, 0, self._buffer)
+        documents.enforce_budget()
+
+        old_count = self._line_count
+        self._line_count = self._buffer.get_line_count()
+        self._search_index.clear()
+        self.notify_observers("text_changed", Damage(0, self._line_count, self._line_count - old_count))
+        self.notify_observers("cursor_moved")
+        self.notify_observers("status_changed")
 
-            if pos != -1:
-                self.set_cursor_pos(pos, y)
-                return
+    def _restore_document(self, document: Document) -> None:
+        """Заново читает файл выгруженного документа"""
+        buffer = LineRope()
+        try:
+            self._watch(document, self._read_file(buffer, document.filename))
+            if document.changed_on_disk():
+                document.undo.clear()
+                if document.journal is not None:
+                    document.journal.reset(file_stamp(document.filename))
+        except Exception as e:
+            raise RuntimeError(f"Load error: {str(e)}")
+        document.buffer = buffer
+        document.trimmed = 0
+
+    def has_swap(self) -> bool:
+        """У текущего файла есть журнал правок, оставшийся от аварийно завершенного сеанса"""
+        journal = self._documents.current.journal
+        return journal is not None and journal.stale is not None
+
+    def swap_owner(self) -> str:
+        """Другой работающий сеанс, который ведет журнал текущего файла ("" - такого нет)"""
+        journal = self._documents.current.journal
+        if journal is None or journal.owner is None:
+            return ""
+        pid, host = journal.owner
+        return f"pid {pid} on {host}"
+
+    def recover(self) -> None:
+        """Применяет к файлу правки из журнала, оставшегося от аварийно завершенного сеанса"""
+        document = self._documents.current
+        journal = document.journal
+        if journal is None or journal.stale is None:
+            raise RuntimeError("No swap file to recover")
+        filename = journal.filename
+        stamp, first_line, records = read_swap(journal.stale)
+        if stamp != file_stamp(filename):
+            raise RuntimeError(f"{filename} changed after the swap file was written")
+        if os.path.exists(filename):
+            self.load_file(filename)
+        else:
+            # Файл так и не был сохранен: правки применяются к пустому тексту
+            self._buffer.reset(("",))
+            self._undo.clear()
+            self._open_journal(document, filename)
+        old_count = self._line_count
+        try:
+            self.begin_change()
+            for x0, y0, x1, y1, text in records:
+                # Правки буфера, в котором :follow отбросил начало файла, сдвигаются к строкам всего файла
+                y0, y1 = y0 + first_line, y1 + first_line
+                if (x0, y0) != (x1, y1):
+                    self._delete(x0, y0, x1, y1)
+                if text:
+                    self._insert(x0, y0, text)
+                self._cursor.set_pos(x0, y0)
+        except Exception as e:
+            raise RuntimeError(f"Swap file is damaged: {str(e)}")
+        finally:
+            self.end_change()
+            self._cursor.move_cursor(0, 0, self._buffer)
+            self._text_changed(0, old_count)
+        self.modify = bool(records)
+        document.journal.drop_stale()
+
+    def close(self) -> None:
+        """Штатное завершение: журналы правок больше не нужны"""
+        for document in self._documents.documents:
+            if document.journal is not None:
+                document.journal.discard()
+                self._flusher.remove(document.journal)
+            if document.follower is not None:
+                document.follower.stop()
+        self._flusher.stop()
+        self._watcher.stop()
+
+    def get_search_pattern(self) -> str:
+        return self._search_index.pattern
+
+    def clear_search(self) -> None:
+        """Сбрасывает образец поиска (и подсветку совпадений)"""
+        self._search_index.set_pattern("")
+        self.notify_observers("status_changed")
+
+    def search_string(self, word: str, forward: bool, cancelled: Optional[Callable[[], bool]] = None):
+        """Переходит к ближайшему совпадению; очень большие неизмененные файлы просматриваются параллельно"""
+        if not word:
+            return
+        self._search_index.set_pattern(word)
+        now_x, now_y = self._cursor.get_pos()
+        source = self._buffer.get_source()
+        # Исполнители ищут по байтам: образец с не-ASCII символами ищется по тексту, где он сравнивается посимвольно
+        if isinstance(source, MappedFile) and source.size >= PARALLEL_SEARCH_THRESHOLD and not spans_lines(word) \
+                and word.isascii():
+            try:
+                found = self._parallel_search.find(source, word, now_x, now_y, forward, cancelled)
+            except Exception:
+                # Файл изменился на диске или пул недоступен - ищем по тексту буфера
+                found = self._search_index.find(self._buffer, now_x, now_y, forward)
+        else:
+            found = self._search_index.find(self._buffer, now_x, now_y, forward)
+        if found is not None:
+            self.set_cursor_pos(*found)
 
     def find_after(self) -> None:
         pass
@@ -0,0 +1,167 @@
+import mmap
+import multiprocessing
+import os
+from bisect import bisect_right
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from model.mapped_file import MappedFile
+from model.search_index import compile_pattern
+
+CHUNK_SIZE = 64 * 1024 * 1024
+WINDOW_SIZE = 4 * 1024 * 1024  # Столько байт исполнитель просматривает между проверками отмены
+POLL_INTERVAL = 0.05
+
+# Задача поиска: окно [start, end) и допустимые начала совпадений [lo, hi)
+Task = Tuple[int, int, int, int]
+
+_worker_files: Dict[str, Tuple[Tuple[int, int], mmap.mmap]] = {}
+_generation = None  # Номер текущего поиска, общий для пула: задача старого поиска прерывается
+
+
+def _init_worker(generation) -> None:
+    global _generation
+    _generation = generation
+
+
+def _cancelled(generation: int) -> bool:
+    return _generation is not None and _generation.value != generation
+
+
+def _worker_map(path: str, stamp: Tuple[int, int]) -> mmap.mmap:
+    """Отображение файла в процессе-исполнителе; открывается один раз на процесс"""
+    cached = _worker_files.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    stat = os.stat(path)
+    if (stat.st_size, stat.st_mtime_ns) != stamp:
+        raise RuntimeError(f"{path} changed on disk")
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _worker_files[path] = (stamp, mm)
+    return mm
+
+
+def search_chunk(path: str, stamp: Tuple[int, int], pattern: bytes, task: Task, forward: bool,
+                 generation: int = 0) -> int:
+    """Первое (forward) или последнее совпадение в окне файла; -1, если его нет или поиск отменен.
+
+    Окно просматривается кусками по WINDOW_SIZE, разрезанными по переводам строк (образец не может
+    захватить перевод строки), и между кусками проверяется, не начался ли уже другой поиск.
+    """
+    start, end, lo, hi = task
+    mm = _worker_map(path, stamp)
+    regex = compile_pattern(pattern)
+    last = -1
+    pos = max(start, lo)
+    while pos < end:
+        if _cancelled(generation):
+            return -1
+        stop = mm.find(b'\n', pos + WINDOW_SIZE, end) if pos + WINDOW_SIZE < end else -1
+        stop = end if stop == -1 else stop
+        if forward:
+            match = regex.search(mm, pos, stop)
+            if match:
+                return match.start() if match.start() < hi else -1
+        else:
+            for match in regex.finditer(mm, pos, stop):
+                if match.start() >= hi:
+                    return last
+                last = match.start()
+        pos = stop
+    return last
+
+
+def _pool_context():
+    """Исполнители не создаются fork: в редакторе уже работают потоки сохранения, журналов и :follow"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class ParallelSearch:
+    """Поиск по большому отображенному файлу: файл режется на куски по границам строк,
+    куски просматриваются в пуле процессов, каждый процесс сам отображает файл в память.
+
+    Результат - ближайшее к курсору совпадение в нужном направлении (с переходом через конец файла).
+    Как только найдено совпадение, более дальние куски отменяются.
+    Образец применяется к байтам UTF-8, поэтому \\w, \\b и поиск без учета регистра работают только для ASCII.
+    """
+
+    def __init__(self, workers: Optional[int] = None) -> None:
+        self._workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._generation = None  # Номер поиска в общей памяти пула
+
+    def _chunks(self, source: MappedFile) -> List[int]:
+        """Границы кусков - начала строк около кратных CHUNK_SIZE"""
+        bounds = [0]
+        for pos in range(CHUNK_SIZE, source.size, CHUNK_SIZE):
+            bound = min(source.get_line_offset(source.line_at(pos) + 1), source.size)
+            if bound > bounds[-1]:
+                bounds.append(bound)
+        if bounds[-1] < source.size:
+            bounds.append(source.size)
+        return bounds
+
+    def _tasks(self, source: MappedFile, cursor: int, y: int, forward: bool) -> List[Task]:
+        """Куски в порядке удаления от курсора"""
+        bounds = self._chunks(source)
+        count = len(bounds) - 1
+        line_start = source.get_line_offset(y)
+        line_end = min(source.get_line_offset(y + 1), source.size)
+        current = min(bisect_right(bounds, line_start) - 1, count - 1)
+        chunk_start, chunk_end = bounds[current], bounds[current + 1]
+        whole = [(bounds[i], bounds[i + 1], 0, source.size) for i in range(count)]
+        if forward:
+            return ([(line_start, chunk_end, cursor + 1, source.size)] + whole[current + 1:] + whole[:current]
+                    + [(chunk_start, line_end, 0, cursor + 1)])
+        return ([(chunk_start, line_end, 0, cursor)] + whole[:current][::-1] + whole[current + 1:][::-1]
+                + [(line_start, chunk_end, cursor, source.size)])
+
+    def find(self, source: MappedFile, pattern: str, x: int, y: int, forward: bool,
+             cancelled: Optional[Callable[[], bool]] = None) -> Optional[Tuple[int, int]]:
+        """Позиция (x, y) ближайшего совпадения или None; cancelled опрашивается, пока идет поиск"""
+        if source.size == 0:
+            return None
+        if self._pool is None:
+            context = _pool_context()
+            self._generation = context.Value('q', 0, lock=False)
+            self._pool = ProcessPoolExecutor(self._workers, mp_context=context,
+                                             initializer=_init_worker, initargs=(self._generation,))
+        self._generation.value += 1
+        generation = self._generation.value
+        cursor = source.get_line_offset(y) + len(source.get_line(y)[:x].encode('utf-8'))
+        stamp = source.stamp
+        tasks = self._tasks(source, cursor, y, forward)
+        futures: List[Future] = [
+            self._pool.submit(search_chunk, source.filename, stamp, pattern.encode('utf-8'), task, forward, generation)
+            for task in tasks
+        ]
+        order = {future: i for i, future in enumerate(futures)}
+        best: Optional[int] = None
+        try:
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.cancelled() or future.result() == -1:
+                        continue
+                    index = order[future]
+                    if best is None or index < best:
+                        best = index
+                        # Все, что дальше найденного, уже не нужно
+                        for later in futures[best + 1:]:
+                            later.cancel()
+                        pending = {f for f in pending if order[f] < best}
+                if best is not None and not pending:
+                    break
+                if pending and cancelled is not None and cancelled():
+                    return None
+        finally:
+            for future in futures:
+                future.cancel()
+            # Уже начатые задачи этого поиска прервутся на следующем куске
+            self._generation.value += 1
+        if best is None:
+            return None
+        return source.position_of(futures[best].result())
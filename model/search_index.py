@@ -0,0 +1,198 @@
+import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from itertools import accumulate, islice
+from typing import AnyStr, Iterator, List, Optional, Pattern, Tuple
+
+from interfaces.ITextBuffer import ITextBuffer
+from model.damage import Damage
+
+SCAN_CHUNK = 4096
+# Конструкции, которые могут совпасть с переводом строки
+MULTILINE_TOKENS = ('\\n', '\\s', '\\S', '\\W', '\\D', '[^', '(?')
+
+
+@lru_cache(maxsize=64)
+def compile_pattern(pattern: AnyStr) -> Pattern:
+    """Компилирует регулярное выражение; некорректное выражение ищется как обычная строка"""
+    try:
+        return re.compile(pattern, re.MULTILINE)
+    except re.error:
+        return re.compile(re.escape(pattern), re.MULTILINE)
+
+
+def spans_lines(pattern: str) -> bool:
+    """Может ли совпадение захватить перевод строки"""
+    return any(token in pattern for token in MULTILINE_TOKENS)
+
+
+class SearchIndex:
+    """Кэш совпадений последнего поиска: отсортированные номера строк и позиции совпадений в каждой.
+
+    Образец - регулярное выражение. Индекс строится одним проходом по тексту, склеенному из строк,
+    поэтому совпадения могут переходить через конец строки. После правок пересканируются только
+    измененные строки; если образец может захватить перевод строки, индекс строится заново при следующем поиске.
+    Сдвиг номеров строк ниже правки откладывается: к строкам с индекса _shift_from прибавляется _shift
+    при чтении, а в сам список сдвиг вносится только между соседними местами правок.
+    Переход к следующему совпадению - бинарный поиск от курсора.
+    """
+
+    def __init__(self) -> None:
+        self._pattern = ""
+        self._regex = compile_pattern("")
+        self._multiline = False
+        self._built = False
+        self._line_count = 0
+        self._rows: List[int] = []  # Строки, в которых есть совпадения (с индекса _shift_from - без сдвига)
+        self._columns: List[List[int]] = []  # Позиции совпадений для каждой строки из _rows
+        self._shift_from = 0
+        self._shift = 0  # Отложенный сдвиг строк _rows[_shift_from:]
+
+    @property
+    def pattern(self) -> str:
+        return self._pattern
+
+    def set_pattern(self, pattern: str) -> None:
+        if pattern != self._pattern:
+            self._pattern = pattern
+            self._regex = compile_pattern(pattern)
+            self._multiline = spans_lines(pattern)
+            self.clear()
+
+    def clear(self) -> None:
+        self._built = False
+        self._rows = []
+        self._columns = []
+        self._shift_from = 0
+        self._shift = 0
+
+    def _row(self, i: int) -> int:
+        return self._rows[i] + self._shift if i >= self._shift_from else self._rows[i]
+
+    def _bisect(self, y: int, right: bool = False) -> int:
+        """bisect_left (bisect_right) по строкам с учетом отложенного сдвига"""
+        bisect = bisect_right if right else bisect_left
+        i = bisect(self._rows, y, 0, self._shift_from)
+        if i < self._shift_from:
+            return i
+        return bisect(self._rows, y - self._shift, self._shift_from)
+
+    def _move_shift(self, index: int) -> None:
+        """Переносит начало отложенного сдвига к index; меняются только строки между старым и новым началом"""
+        rows, shift = self._rows, self._shift
+        if shift:
+            for i in range(self._shift_from, index):
+                rows[i] += shift
+            for i in range(index, self._shift_from):
+                rows[i] -= shift
+        self._shift_from = index
+
+    def _scan(self, buffer: ITextBuffer, start: int, stop: int) -> Tuple[List[int], List[List[int]]]:
+        """Совпадения в строках [start, stop), каждая строка сканируется отдельно"""
+        rows: List[int] = []
+        columns: List[List[int]] = []
+        search = self._regex.search
+        finditer = self._regex.finditer
+        for first in range(start, stop, SCAN_CHUNK):
+            for y, line in enumerate(buffer.get_lines(first, min(stop, first + SCAN_CHUNK)), first):
+                if search(line):
+                    rows.append(y)
+                    columns.append([match.start() for match in finditer(line)])
+        return rows, columns
+
+    def _chunks(self, buffer: ITextBuffer) -> Iterator[List[str]]:
+        """Строки буфера по SCAN_CHUNK; iter_lines читает блоки подряд, без поиска каждого куска в индексе"""
+        lines = buffer.iter_lines()
+        chunk = list(islice(lines, SCAN_CHUNK))
+        while chunk:
+            yield chunk
+            chunk = list(islice(lines, SCAN_CHUNK))
+
+    def _build(self, buffer: ITextBuffer) -> None:
+        """Проход по тексту кусками по SCAN_CHUNK строк: в памяти только текущий кусок и строки с совпадениями.
+
+        Если совпадение может захватить перевод строки, к куску приклеивается следующий, а сканирование
+        следующего куска начинается там, где закончилось последнее совпадение; совпадения длиннее
+        SCAN_CHUNK строк могут быть найдены не целиком.
+        """
+        rows: List[int] = []
+        columns: List[List[int]] = []
+        finditer = self._regex.finditer
+        first = 0  # Номер первой строки куска
+        skip = 0  # Сколько символов куска уже вошло в совпадение из предыдущего куска
+        chunks = self._chunks(buffer)
+        chunk = next(chunks, [])
+        while chunk:
+            following = next(chunks, [])
+            text = '\n'.join(chunk)
+            size = len(text)
+            if self._multiline and following:
+                text += '\n' + '\n'.join(following)
+            starts = [0]
+            starts.extend(accumulate(len(line) + 1 for line in chunk))
+            y = 0
+            end = 0
+            for match in finditer(text, skip):
+                pos = match.start()
+                if pos > size:
+                    break  # Совпадение начинается в следующем куске
+                if pos >= starts[y + 1]:
+                    y = bisect_right(starts, pos, y + 1) - 1
+                if not rows or rows[-1] != first + y:
+                    rows.append(first + y)
+                    columns.append([])
+                columns[-1].append(pos - starts[y])
+                end = match.end()
+            skip = max(0, end - size - 1)
+            first += len(chunk)
+            chunk = following
+        self._line_count = first
+        self._rows, self._columns = rows, columns
+        self._shift_from, self._shift = 0, 0
+        self._built = True
+
+    def invalidate(self, buffer: ITextBuffer, damage: Damage) -> None:
+        """Старые строки [start, stop - delta) заменены новыми [start, stop): пересканируем только их"""
+        if not self._built:
+            return
+        old_stop = damage.stop - damage.delta
+        if self._multiline or (damage.start == 0 and old_stop >= self._line_count):
+            # Индекс построится заново при следующем поиске
+            self.clear()
+            return
+        first = self._bisect(damage.start)
+        last = self._bisect(old_stop)
+        rows, columns = self._scan(buffer, damage.start, damage.stop)
+        self._move_shift(last)
+        self._rows[first:last] = rows
+        self._columns[first:last] = columns
+        self._shift_from = first + len(rows)
+        self._shift += damage.delta
+        self._line_count += damage.delta
+
+    def find(self, buffer: ITextBuffer, x: int, y: int, forward: bool) -> Optional[Tuple[int, int]]:
+        """Ближайшее совпадение после (до) позиции курсора с переходом через конец (начало) файла"""
+        if not self._pattern:
+            return None
+        if not self._built:
+            self._build(buffer)
+        count = len(self._rows)
+        if not count:
+            return None
+        if forward:
+            i = self._bisect(y)
+            if i < count and self._row(i) == y:
+                j = bisect_right(self._columns[i], x)
+                if j < len(self._columns[i]):
+                    return self._columns[i][j], y
+                i += 1
+            i %= count
+            return self._columns[i][0], self._row(i)
+        i = self._bisect(y, right=True) - 1
+        if i >= 0 and self._row(i) == y:
+            j = bisect_left(self._columns[i], x) - 1
+            if j >= 0:
+                return self._columns[i][j], y
+            i -= 1
+        i %= count
+        return self._columns[i][-1], self._row(i)
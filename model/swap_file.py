@@ -0,0 +1,302 @@
+import os
+import socket
+import struct
+import threading
+from typing import List, Optional, Set, Tuple
+
+MAGIC = b"MYVIMSW3"
+# Размер и mtime_ns файла, к которому применяются записи, и номер строки файла, с которой начинается буфер
+HEADER = struct.Struct("<QQQ")
+OWNER = struct.Struct("<I64s")  # PID и имя машины сеанса, который пишет журнал
+RECORD = struct.Struct("<IIIII")  # Правка: удаляется (x0, y0) - (x1, y1), вставляется текст длиной n байт
+FLUSH_INTERVAL = 1.0  # Секунд между сбросами журналов на диск
+
+Stamp = Tuple[int, int]
+Record = Tuple[int, int, int, int, str]
+Owner = Tuple[int, str]
+
+
+def swap_path(filename: str) -> str:
+    """Журнал лежит рядом с файлом: dir/name -> dir/.name.swp"""
+    directory, name = os.path.split(os.path.abspath(filename))
+    return os.path.join(directory, f".{name}.swp")
+
+
+def file_stamp(filename: str) -> Stamp:
+    """(размер, mtime_ns) файла; (0, 0) - файла еще нет"""
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return 0, 0
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _process_alive(pid: int) -> bool:
+    if os.name == 'nt':
+        import ctypes
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Процесс есть, но принадлежит другому пользователю
+    return True
+
+
+def read_owner(path: str) -> Optional[Owner]:
+    """Сеанс, записавший журнал; None - журнал не читается или поврежден"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read(len(MAGIC) + HEADER.size + OWNER.size)
+    except OSError:
+        return None
+    if not data.startswith(MAGIC) or len(data) < len(MAGIC) + HEADER.size + OWNER.size:
+        return None
+    pid, host = OWNER.unpack_from(data, len(MAGIC) + HEADER.size)
+    return pid, host.rstrip(b"\0").decode("utf-8", errors="replace")
+
+
+def live_owner(path: str) -> Optional[Owner]:
+    """Другой работающий сеанс, который ведет этот журнал; None - журнал остался от упавшего сеанса.
+
+    Журнал с другой машины считается живым: проверить его процесс нельзя.
+    """
+    owner = read_owner(path)
+    if owner is None:
+        return None
+    pid, host = owner
+    if host != socket.gethostname():
+        return owner
+    if pid == os.getpid() or not _process_alive(pid):
+        return None
+    return owner
+
+
+def read_swap(path: str) -> Tuple[Stamp, int, List[Record]]:
+    """Читает журнал: состояние файла, номер его первой строки в буфере и правки.
+
+    Оборванная при сбое последняя запись отбрасывается.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC) or len(data) < len(MAGIC) + HEADER.size + OWNER.size:
+        raise RuntimeError(f"Not a swap file: {path}")
+    file_size, mtime, first_line = HEADER.unpack_from(data, len(MAGIC))
+    pos = len(MAGIC) + HEADER.size + OWNER.size
+    records: List[Record] = []
+    while pos + RECORD.size <= len(data):
+        x0, y0, x1, y1, size = RECORD.unpack_from(data, pos)
+        pos += RECORD.size
+        if pos + size > len(data):
+            break
+        records.append((x0, y0, x1, y1, data[pos:pos + size].decode("utf-8")))
+        pos += size
+    return (file_size, mtime), first_line, records
+
+
+class SwapJournal:
+    """Журнал правок одного файла: каждая правка дописывается в конец файла журнала.
+
+    Записи копятся в памяти и сбрасываются фоновым потоком (JournalFlusher), поэтому правка стоит
+    только упаковки записи. После сохранения журнал начинается заново от сохраненного файла.
+    Журнал, оставшийся от упавшего сеанса (stale), не перезаписывается: при первой правке
+    он переименовывается в .bak, пока его не восстановят через :recover. Журнал, который ведет
+    другой работающий сеанс (owner), не трогается совсем, а правки этого сеанса не журналируются.
+    Если начало файла в буфере отброшено (:follow), строки правок отсчитываются от first_line.
+    """
+
+    def __init__(self, filename: str, stamp: Stamp) -> None:
+        self.filename = filename
+        self.path = swap_path(filename)
+        self.owner: Optional[Owner] = None
+        self.stale: Optional[str] = None
+        if os.path.exists(self.path):
+            self.owner = live_owner(self.path)
+            if self.owner is None:
+                self.stale = self.path
+        self._stamp = stamp
+        self._first_line = 0  # Строка файла, которая в буфере первая
+        self._pending = bytearray()
+        self._lock = threading.Lock()  # Защищает _pending
+        self._io_lock = threading.Lock()  # Запись в файл журнала
+        self._file = None
+        self._started = False  # Заголовок уже в _pending или в файле
+        self._seq = 0  # Номер следующей записи
+        self._marks = 0  # Сколько сохранений ждут завершения
+        self._kept: List[Tuple[int, bytes]] = []  # Записи с начала самого раннего из них
+
+    def record(self, x0: int, y0: int, x1: int, y1: int, text: str) -> None:
+        if self.owner is not None:
+            return
+        data = text.encode("utf-8")
+        entry = RECORD.pack(x0, y0, x1, y1, len(data)) + data
+        with self._lock:
+            if not self._started:
+                self._start()
+            self._pending += entry
+            if self._marks:
+                self._kept.append((self._seq, entry))
+            self._seq += 1
+
+    def _start(self) -> None:
+        if self.stale == self.path:
+            os.replace(self.path, self.path + ".bak")
+            self.stale = self.path + ".bak"
+        self._pending += self._header(self._stamp, self._first_line)
+        self._started = True
+
+    @staticmethod
+    def _header(stamp: Stamp, first_line: int) -> bytes:
+        host = socket.gethostname().encode("utf-8")[:OWNER.size - 4]
+        return MAGIC + HEADER.pack(*stamp, first_line) + OWNER.pack(os.getpid(), host)
+
+    def flush(self) -> None:
+        with self._io_lock:
+            with self._lock:
+                data = bytes(self._pending)
+                self._pending.clear()
+            if not data:
+                return
+            try:
+                self._write(data)
+            except OSError:
+                with self._lock:
+                    self._pending[0:0] = data
+                raise
+
+    def _write(self, data: bytes) -> None:
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def mark(self) -> int:
+        """Начало сохранения: записи после этой точки понадобятся, если во время записи файла будут правки"""
+        with self._lock:
+            self._marks += 1
+            return self._seq
+
+    def saved(self, mark: int, stamp: Stamp, filename: Optional[str] = None) -> None:
+        """Снимок, сделанный в точке mark, записан в файл: журнал начинается заново от него.
+
+        filename - новое имя файла, если документ сохранен под другим именем.
+        """
+        with self._io_lock:
+            with self._lock:
+                self._marks = max(0, self._marks - 1)
+                self._kept = [(seq, entry) for seq, entry in self._kept if seq >= mark]
+                data = self._header(stamp, 0) + b"".join(entry for _, entry in self._kept)
+                if not self._marks:
+                    self._kept = []
+                # Правки после снимка остались только в _kept: записи до него уже в сохраненном файле
+                unsaved = self._seq > mark
+                started = self._started
+                self._stamp = stamp
+                self._first_line = 0  # В файл записан весь буфер
+                self._pending.clear()
+                self._started = unsaved
+            self._close_file()
+            if started:
+                # Чужой журнал и журнал упавшего сеанса не удаляются
+                self._remove(self.path)
+            if filename is not None and filename != self.filename:
+                self.filename = filename
+                self.path = swap_path(filename)
+            if unsaved:
+                self._write(data)
+
+    def cancel(self) -> None:
+        """Сохранение не удалось"""
+        with self._lock:
+            self._marks = max(0, self._marks - 1)
+            if not self._marks:
+                self._kept = []
+
+    def reset(self, stamp: Stamp, first_line: int = 0) -> None:
+        """Текст снова совпадает с файлом на диске (начиная со строки first_line): старые записи не нужны"""
+        with self._io_lock:
+            with self._lock:
+                self._stamp = stamp
+                self._first_line = first_line
+                self._pending.clear()
+                self._kept = []
+                started = self._started
+                self._started = False
+            self._close_file()
+            if started:
+                self._remove(self.path)
+
+    def discard(self) -> None:
+        """Документ закрыт без аварии: журнал удаляется"""
+        with self._io_lock:
+            with self._lock:
+                self._pending.clear()
+                self._close_file()
+                if self._started:
+                    self._remove(self.path)
+                self._started = False
+
+    def drop_stale(self) -> None:
+        if self.stale is not None:
+            self._remove(self.stale)
+            self.stale = None
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class JournalFlusher:
+    """Фоновый поток, который раз в interval секунд сбрасывает все журналы на диск"""
+
+    def __init__(self, interval: float = FLUSH_INTERVAL) -> None:
+        self.interval = interval
+        self._journals: Set[SwapJournal] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, journal: SwapJournal) -> None:
+        with self._lock:
+            self._journals.add(journal)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="swap-flush", daemon=True)
+            self._thread.start()
+
+    def remove(self, journal: SwapJournal) -> None:
+        with self._lock:
+            self._journals.discard(journal)
+
+    def _journals_snapshot(self) -> List[SwapJournal]:
+        with self._lock:
+            return list(self._journals)
+
+    def flush(self) -> None:
+        for journal in self._journals_snapshot():
+            try:
+                journal.flush()
+            except OSError:
+                # Диск недоступен - попробуем в следующий раз, данные остаются в памяти
+                pass
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.flush()
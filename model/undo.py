@@ -0,0 +1,140 @@
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+DEFAULT_MAX_CHARS = 16 * 1024 * 1024
+
+
+def text_end(x: int, y: int, text: str) -> Tuple[int, int]:
+    """Позиция конца текста text, вставленного в (x, y)"""
+    newlines = text.count('\n')
+    if not newlines:
+        return x + len(text), y
+    return len(text) - text.rfind('\n') - 1, y + newlines
+
+
+class Change:
+    """Одна правка: в позиции (x, y) текст removed заменен текстом inserted"""
+
+    __slots__ = ('x', 'y', 'removed', '_parts', 'end')
+
+    def __init__(self, x: int, y: int, removed: str, inserted: str) -> None:
+        self.x = x
+        self.y = y
+        self.removed = removed
+        self._parts = [inserted]  # Вставленный текст копится кусками, склеивается при чтении
+        self.end = text_end(x, y, inserted)
+
+    @property
+    def inserted(self) -> str:
+        if len(self._parts) > 1:
+            self._parts = [''.join(self._parts)]
+        return self._parts[0]
+
+    def extend(self, text: str) -> None:
+        self._parts.append(text)
+        self.end = text_end(self.end[0], self.end[1], text)
+
+    def shrink(self, count: int) -> None:
+        inserted = self.inserted[:-count]
+        self._parts = [inserted]
+        self.end = text_end(self.x, self.y, inserted)
+
+
+class ChangeGroup:
+    """Правки, которые отменяются одной командой, и позиция курсора до них"""
+
+    __slots__ = ('cursor', 'changes')
+
+    def __init__(self, cursor: Tuple[int, int]) -> None:
+        self.cursor = cursor
+        self.changes: List[Change] = []
+
+
+class UndoJournal:
+    """Журнал отмены из минимальных правок (позиция, удалено, вставлено).
+
+    Подряд идущие вставки (и стирание только что набранного) внутри группы склеиваются в одну правку,
+    поэтому сеанс ввода занимает одну запись. Старые группы вытесняются, когда суммарный объем
+    текста в журнале превышает max_chars.
+    """
+
+    def __init__(self, max_chars: int = DEFAULT_MAX_CHARS) -> None:
+        self.max_chars = max_chars
+        self._undo: Deque[ChangeGroup] = deque()
+        self._redo: List[ChangeGroup] = []
+        self._open: Optional[ChangeGroup] = None
+        self._open_cursor = (0, 0)
+        self._depth = 0
+        self._chars = 0  # Объем текста во всех группах, включая отмененные
+
+    @staticmethod
+    def _group_chars(group: ChangeGroup) -> int:
+        return sum(len(change.removed) + len(change.inserted) for change in group.changes)
+
+    def clear(self) -> None:
+        self._undo.clear()
+        self._redo = []
+        self._open = None
+        self._depth = 0
+        self._chars = 0
+
+    def begin(self, cursor: Tuple[int, int]) -> None:
+        """Начинает группу; вложенные группы сливаются с внешней"""
+        if self._depth == 0:
+            self._open = None
+            self._open_cursor = cursor
+        self._depth += 1
+
+    def end(self) -> None:
+        if self._depth > 0:
+            self._depth -= 1
+        if self._depth == 0:
+            self._open = None
+
+    def record(self, x: int, y: int, removed: str, inserted: str, cursor: Tuple[int, int]) -> None:
+        if not removed and not inserted:
+            return
+        if self._redo:
+            self._chars -= sum(self._group_chars(undone) for undone in self._redo)
+            self._redo = []
+        group = self._open
+        if group is None:
+            group = ChangeGroup(self._open_cursor if self._depth else cursor)
+            self._undo.append(group)
+            if self._depth:
+                self._open = group
+        self._chars += len(removed) + len(inserted)
+        last = group.changes[-1] if group.changes else None
+        if last is not None and not removed and last.end == (x, y):
+            last.extend(inserted)
+        elif last is not None and not inserted and text_end(x, y, removed) == last.end \
+                and len(removed) <= len(last.inserted) and last.inserted.endswith(removed):
+            last.shrink(len(removed))
+            self._chars -= 2 * len(removed)
+        else:
+            group.changes.append(Change(x, y, removed, inserted))
+        self._trim()
+
+    def _trim(self) -> None:
+        while self._chars > self.max_chars and len(self._undo) > 1:
+            self._chars -= self._group_chars(self._undo.popleft())
+
+    def undo(self) -> Optional[ChangeGroup]:
+        self.end_all()
+        if not self._undo:
+            return None
+        group = self._undo.pop()
+        self._redo.append(group)
+        return group
+
+    def redo(self) -> Optional[ChangeGroup]:
+        self.end_all()
+        if not self._redo:
+            return None
+        group = self._redo.pop()
+        self._undo.append(group)
+        return group
+
+    def end_all(self) -> None:
+        self._depth = 0
+        self._open = None
@@ -0,0 +1,94 @@
+from array import array, typecodes
+
+from profiler import PROFILER
+
+# Каждый элемент массива - один символ Unicode, чтобы size() и индексы совпадали с str
+if 'w' in typecodes:
+    TYPECODE = 'w'  # UCS-4 (Python 3.13+)
+elif array('u').itemsize == 4:
+    TYPECODE = 'u'  # wchar_t в 4 байта (Linux, macOS) - тоже UCS-4
+else:
+    TYPECODE = 'I'  # 'u' на Windows - UTF-16: символы вне BMP заняли бы два элемента, храним номера символов
+
+if TYPECODE == 'I':
+    def _to_chars(text: str) -> array:
+        return array('I', map(ord, text))
+
+    def _to_text(chars: array) -> str:
+        return ''.join(map(chr, chars))
+else:
+    def _to_chars(text: str) -> array:
+        return array(TYPECODE, text)
+
+    def _to_text(chars: array) -> str:
+        return chars.tounicode()
+
+
+class my_string:
+    """Изменяемая строка: символы лежат в массиве и правятся на месте, готовая str кэшируется до следующей правки.
+
+    Интерфейс insert/replace/substr/size/c_str плюс групповые операции splice/split_off/append,
+    которые меняют строку за один проход без промежуточных копий.
+    """
+
+    __slots__ = ('_chars', '_text')
+
+    def __init__(self, text: str = "") -> None:
+        text = str(text)
+        self._chars = _to_chars(text)
+        self._text = text
+
+    def c_str(self) -> str:
+        if self._text is None:
+            self._text = _to_text(self._chars)
+        return self._text
+
+    def __str__(self) -> str:
+        return self.c_str()
+
+    def __repr__(self) -> str:
+        return f"my_string({self.c_str()!r})"
+
+    def size(self) -> int:
+        return len(self._chars)
+
+    def __len__(self) -> int:
+        return len(self._chars)
+
+    def substr(self, pos: int, count: int = -1) -> str:
+        if count < 0:
+            return self.c_str()[pos:]
+        return self.c_str()[pos:pos + count]
+
+    def insert(self, pos: int, text: str) -> None:
+        if text:
+            self._chars[pos:pos] = _to_chars(text)
+            self._text = None
+
+    def replace(self, pos: int, count: int, text: str) -> None:
+        self._chars[pos:pos + count] = _to_chars(text)
+        self._text = None
+
+    def append(self, text: str) -> None:
+        if text:
+            self._chars.extend(_to_chars(text))
+            self._text = None
+
+    def splice(self, pos: int, count: int, text: str = "") -> str:
+        """Заменяет count символов с позиции pos на text и возвращает удаленные символы"""
+        removed = _to_text(self._chars[pos:pos + count])
+        self._chars[pos:pos + count] = _to_chars(text)
+        self._text = None
+        return removed
+
+    def split_off(self, pos: int) -> 'my_string':
+        """Отрезает хвост строки начиная с pos и возвращает его как новую строку"""
+        tail = my_string()
+        tail._chars = self._chars[pos:]
+        tail._text = None
+        del self._chars[pos:]
+        self._text = None
+        return tail
+
+
+PROFILER.count(my_string, "__init__", "MyString")
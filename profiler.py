@@ -0,0 +1,141 @@
+import json
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+PHASES = ("input", "model", "dispatch", "wrap", "draw")
+COUNTERS = ("MyString", "add_str")
+HISTORY = 1000  # Сколько последних кадров хранится для статистики
+
+
+class Profiler:
+    """Замеры времени по фазам обработки клавиш и счетчики горячих вызовов.
+
+    Модули регистрируют свои горячие методы (phase/count/frame), но обертки ставятся на классы только
+    в enable() и снимаются в disable(), поэтому выключенный профилировщик ничего не стоит.
+    Время фазы считается без вложенных замеренных вызовов: отрисовка внутри рассылки событий
+    попадает в draw, а не в dispatch.
+    """
+
+    def __init__(self, history: int = HISTORY) -> None:
+        self._hooks: List[Tuple[type, str, Callable[[Callable], Callable]]] = []
+        self._originals: List[Tuple[type, str, Any]] = []
+        self._frames: Deque[Dict[str, float]] = deque(maxlen=history)
+        self._stack: List[float] = []  # Время вложенных замеров для каждого открытого вызова
+        self._current = self._new_frame()
+        self.enabled = False
+
+    @staticmethod
+    def _new_frame() -> Dict[str, float]:
+        frame = dict.fromkeys(PHASES, 0.0)
+        frame.update(dict.fromkeys(COUNTERS, 0))
+        frame["keys"] = 0
+        return frame
+
+    def phase(self, cls: type, name: str, phase: str) -> None:
+        """Время метода cls.name относится к фазе phase"""
+        self._hooks.append((cls, name, lambda method: self._timed(method, phase)))
+
+    def count(self, cls: type, name: str, counter: str) -> None:
+        """Каждый вызов cls.name увеличивает счетчик counter"""
+        self._hooks.append((cls, name, lambda method: self._counted(method, counter)))
+
+    def frame(self, cls: type, name: str) -> None:
+        """cls.name обрабатывает один кадр и возвращает число обработанных клавиш"""
+        self._hooks.append((cls, name, self._framed))
+
+    def _timed(self, method: Callable, phase: Optional[str]) -> Callable:
+        stack = self._stack
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            stack.append(0.0)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = stack.pop()
+                if phase is not None:
+                    self._current[phase] += elapsed - nested
+                if stack:
+                    stack[-1] += elapsed
+        return timed
+
+    def _counted(self, method: Callable, counter: str) -> Callable:
+        def counted(*args, **kwargs):
+            self._current[counter] += 1
+            return method(*args, **kwargs)
+        return counted
+
+    def _framed(self, method: Callable) -> Callable:
+        # Собственное время кадра - это в основном ожидание ввода, в фазы оно не входит
+        timed = self._timed(method, None)
+
+        def framed(*args, **kwargs):
+            keys = timed(*args, **kwargs)
+            if keys or self._current["draw"]:
+                self._current["keys"] = keys or 0
+                self._frames.append(self._current)
+                self._current = self._new_frame()
+            return keys
+        return framed
+
+    def enable(self) -> None:
+        if self.enabled:
+            return
+        for cls, name, wrap in self._hooks:
+            original = cls.__dict__[name]
+            self._originals.append((cls, name, original))
+            setattr(cls, name, wrap(original))
+        self.enabled = True
+
+    def disable(self) -> None:
+        for cls, name, original in reversed(self._originals):
+            setattr(cls, name, original)
+        self._originals = []
+        self.enabled = False
+
+    def reset(self) -> None:
+        self._frames.clear()
+        self._current = self._new_frame()
+
+    def report(self) -> Dict[str, Any]:
+        """Статистика по последним кадрам; время - в миллисекундах"""
+        frames = list(self._frames)
+        keys = sum(frame["keys"] for frame in frames)
+        totals = sorted(sum(frame[phase] for phase in PHASES) * 1000 for frame in frames)
+
+        def percentile(percent: int) -> float:
+            if not totals:
+                return 0.0
+            return totals[min(len(totals) - 1, max(0, round(percent / 100 * len(totals)) - 1))]
+
+        count = max(1, len(frames))
+        return {
+            "frames": len(frames),
+            "keys": keys,
+            "frame_ms": {"p50": percentile(50), "p90": percentile(90), "p99": percentile(99),
+                         "max": totals[-1] if totals else 0.0},
+            "phase_ms": {phase: sum(frame[phase] for frame in frames) * 1000 / count for phase in PHASES},
+            "counters": {counter: sum(frame[counter] for frame in frames) for counter in COUNTERS},
+            "history": [{name: value * 1000 if name in PHASES else value for name, value in frame.items()}
+                        for frame in frames],
+        }
+
+    def summary(self) -> str:
+        """Одна строка для командной строки редактора"""
+        if not self.enabled and not self._frames:
+            return "profiling is off, use :profile on"
+        report = self.report()
+        frame_ms = report["frame_ms"]
+        phases = " ".join(f"{phase} {ms:.2f}" for phase, ms in report["phase_ms"].items())
+        counters = " ".join(f"{name} {value}" for name, value in report["counters"].items())
+        return (f"frames {report['frames']} keys {report['keys']} | frame ms p50 {frame_ms['p50']:.2f} "
+                f"p99 {frame_ms['p99']:.2f} max {frame_ms['max']:.2f} | avg ms {phases} | {counters}")
+
+    def dump(self, filename: str) -> None:
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+PROFILER = Profiler()
@@ -0,0 +1,227 @@
+import keyword
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from interfaces.IModel import IModel
+from interfaces.ILexer import ILexer, Token
+from model.damage import Damage
+
+TOKEN_CACHE_SIZE = 4096
+SCAN_CHUNK = 1024  # Сколько строк запрашивается у модели за раз при проходе вперед
+LOG_NAME = re.compile(r"\.log(\.\d+)?$")  # Журнал: .log или .log.N после ротации
+
+PYTHON_CONSTANTS = ("True", "False", "None")
+PYTHON_TOKENS = re.compile(r"""
+    (?P<comment>\#.*)
+  | (?P<triple>(?:(?<!\w)[rRbBuUfF]{1,2})?(?:'''|\"\"\"))
+  | (?P<string>(?:(?<!\w)[rRbBuUfF]{1,2})?(?:'(?:[^'\\]|\\.)*'?|"(?:[^"\\]|\\.)*"?))
+  | (?P<number>(?<![\w.])(?:0[xXoObB][0-9a-fA-F_]+|\d[\d_]*(?:\.\d*)?(?:[eE][+-]?\d+)?j?))
+  | (?P<constant>\b(?:%s)\b)
+  | (?P<keyword>\b(?:%s)\b)
+""" % ("|".join(PYTHON_CONSTANTS),
+       "|".join(word for word in keyword.kwlist if word not in PYTHON_CONSTANTS)), re.VERBOSE)
+TRIPLE_QUOTES = {1: "'''", 2: '"""'}  # Состояние - незакрытая многострочная строка
+
+JSON_TOKENS = re.compile(r"""
+    (?P<key>"(?:[^"\\]|\\.)*"(?=\s*:))
+  | (?P<string>"(?:[^"\\]|\\.)*"?)
+  | (?P<number>-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<constant>\b(?:true|false|null)\b)
+""", re.VERBOSE)
+
+LOG_TOKENS = re.compile(r"""
+    (?P<comment>\b\d{4}-\d{2}-\d{2}[T\ ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?|\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?)
+  | (?P<error>\b(?:ERROR|FATAL|CRITICAL|SEVERE|Error|Exception|Traceback)\b)
+  | (?P<warning>\b(?:WARN|WARNING|Warning)\b)
+  | (?P<info>\b(?:INFO|DEBUG|TRACE|NOTICE)\b)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+""", re.VERBOSE)
+
+
+class RegexLexer(ILexer):
+    """Лексер без состояния: каждая строка разбирается одним регулярным выражением, имя группы - стиль"""
+
+    def __init__(self, tokens: 're.Pattern[str]') -> None:
+        self._tokens = tokens
+
+    @property
+    def stateless(self) -> bool:
+        return True
+
+    def lex(self, line: str, state: int) -> Tuple[List[Token], int]:
+        return [(match.start(), match.end(), match.lastgroup) for match in self._tokens.finditer(line)], 0
+
+    def end_state(self, line: str, state: int) -> int:
+        return 0
+
+
+class PythonLexer(ILexer):
+    """Лексер Python; состояние - незакрытая строка в тройных кавычках"""
+
+    @property
+    def stateless(self) -> bool:
+        return False
+
+    def lex(self, line: str, state: int) -> Tuple[List[Token], int]:
+        tokens: List[Token] = []
+        pos = 0
+        if state:
+            end = line.find(TRIPLE_QUOTES[state])
+            if end == -1:
+                return ([(0, len(line), 'string')] if line else []), state
+            pos = end + 3
+            tokens.append((0, pos, 'string'))
+        while True:
+            match = PYTHON_TOKENS.search(line, pos)
+            if match is None:
+                return tokens, 0
+            kind = match.lastgroup
+            if kind == 'triple':
+                quote = match.group()[-3:]
+                end = line.find(quote, match.end())
+                if end == -1:
+                    tokens.append((match.start(), len(line), 'string'))
+                    return tokens, 1 if quote == "'''" else 2
+                tokens.append((match.start(), end + 3, 'string'))
+                pos = end + 3
+            else:
+                tokens.append((match.start(), match.end(), kind))
+                pos = match.end()
+
+    def end_state(self, line: str, state: int) -> int:
+        # Большинство строк без кавычек не меняет состояние - их не нужно разбирать
+        if state:
+            if TRIPLE_QUOTES[state] not in line:
+                return state
+        elif "'" not in line and '"' not in line:
+            return 0
+        return self.lex(line, state)[1]
+
+
+LEXERS: Dict[str, ILexer] = {
+    "python": PythonLexer(),
+    "json": RegexLexer(JSON_TOKENS),
+    "log": RegexLexer(LOG_TOKENS),
+}
+
+
+def lexer_for(filename: str) -> Optional[ILexer]:
+    """Лексер по имени файла: .py, .json и журналы (.log, в том числе после ротации: .log.1)"""
+    name = os.path.basename(filename).lower()
+    extension = os.path.splitext(name)[1]
+    if extension in (".py", ".pyw"):
+        return LEXERS["python"]
+    if extension == ".json":
+        return LEXERS["json"]
+    if LOG_NAME.search(name):
+        return LEXERS["log"]
+    return None
+
+
+class Highlighter:
+    """Подсветка синтаксиса видимых строк.
+
+    Для строк помнится состояние лексера в их начале. После правки строки ниже считаются заново
+    только до тех пор, пока новое состояние не совпадет со старым; токены кэшируются по тексту строки
+    и состоянию в ее начале, поэтому прокрутка и правки других строк разбор не повторяют.
+    """
+
+    def __init__(self) -> None:
+        self._filename: Optional[str] = None
+        self._lexer: Optional[ILexer] = None
+        self._tokens: Dict[Tuple[str, int], List[Token]] = {}
+        self._states: List[Optional[int]] = [0]  # Состояние в начале строки; None - неизвестно
+        self._valid = 1  # Состояния строк [0, _valid) точные, дальше - догадки, оставшиеся до правок
+        self._dirty = 0  # Догадкам можно верить только начиная с этой строки (ниже всех правок)
+        self._check: Tuple[int, Optional[int]] = (0, None)  # Первая строка после правки и ее старое состояние
+
+    def set_file(self, filename: str) -> bool:
+        """Выбирает лексер по имени файла; возвращает True, если подсветка сменилась"""
+        if filename == self._filename:
+            return False
+        self._filename = filename
+        lexer = lexer_for(filename)
+        if lexer is self._lexer:
+            return False
+        self._lexer = lexer
+        self._tokens = {}
+        self.reset()
+        return True
+
+    def reset(self) -> None:
+        """Текст заменен целиком"""
+        self._states = [0]
+        self._valid = 1
+        self._dirty = 0
+        self._check = (0, None)
+
+    def invalidate(self, damage: Damage) -> None:
+        """Старые строки [start, stop - delta) заменены новыми [start, stop)"""
+        if self._lexer is None or self._lexer.stateless:
+            return
+        start, stop = damage.start, damage.stop
+        old_stop = stop - damage.delta
+        states = self._states
+        guess = None  # Старое состояние в начале первой строки после правки
+        if old_stop >= len(states):
+            del states[start + 1:]
+        else:
+            # Состояние в начале строки start не меняется; новые строки после нее пока неизвестны
+            guess = states[old_stop]
+            if stop == start:
+                del states[start + 1:old_stop + 1]
+            elif old_stop == start:
+                states[start + 1:start + 1] = [None] * (stop - start - 1) + [guess]
+            else:
+                states[start + 1:old_stop] = [None] * (stop - start - 1)
+        if self._dirty >= old_stop:
+            self._dirty += damage.delta
+        elif self._dirty > start:
+            self._dirty = stop
+        self._dirty = max(self._dirty, stop)
+        self._valid = min(self._valid, start + 1)
+        self._check = (stop, guess)
+
+    def spills(self, model: IModel, y: int) -> bool:
+        """Правка выше строки y поменяла состояние в ее начале, то есть подсветку строк ниже"""
+        line, old = self._check
+        if self._lexer is None or self._lexer.stateless or line != y or y >= model.get_len():
+            return False
+        return old is None or self.state_at(model, y) != old
+
+    def state_at(self, model: IModel, y: int) -> int:
+        if self._lexer is None or self._lexer.stateless:
+            return 0
+        states = self._states
+        lexer = self._lexer
+        while self._valid <= y:
+            first = self._valid - 1
+            lines = model.get_lines(first, min(y, first + SCAN_CHUNK))
+            if not lines:
+                return 0
+            for index, line in enumerate(lines, first + 1):
+                state = lexer.end_state(line, states[index - 1])
+                if index < len(states):
+                    if index >= self._dirty and states[index] == state:
+                        # Дальше состояния совпадают со старыми - пересчет закончен
+                        self._valid = len(states)
+                        break
+                    states[index] = state
+                else:
+                    states.append(state)
+                self._valid = index + 1
+        return states[y]
+
+    def tokens(self, model: IModel, line: str, y: int) -> List[Token]:
+        if self._lexer is None:
+            return []
+        state = self.state_at(model, y)
+        key = (line, state)
+        tokens = self._tokens.get(key)
+        if tokens is None:
+            if len(self._tokens) >= TOKEN_CACHE_SIZE:
+                self._tokens = {}
+            tokens = self._lexer.lex(line, state)[0]
+            self._tokens[key] = tokens
+        return tokens
@@ -0,0 +1,45 @@
+import os
+import stat
+import tempfile
+import unittest
+
+from model.file_saver import NEW_FILE_MODE, FileSaver
+
+
+class FileSaverTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.saver = FileSaver()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def test_new_file_gets_umask_mode(self) -> None:
+        self.saver.save(self.path("new.txt"), [["a", "b"]])
+        with open(self.path("new.txt")) as f:
+            self.assertEqual(f.read(), "a\nb\n")
+        self.assertEqual(stat.S_IMODE(os.stat(self.path("new.txt")).st_mode), NEW_FILE_MODE)
+
+    def test_existing_mode_is_kept(self) -> None:
+        with open(self.path("script.sh"), 'w') as f:
+            f.write("old\n")
+        os.chmod(self.path("script.sh"), 0o750)
+        self.saver.save(self.path("script.sh"), [["new"]])
+        self.assertEqual(stat.S_IMODE(os.stat(self.path("script.sh")).st_mode), 0o750)
+
+    @unittest.skipUnless(hasattr(os, 'symlink'), "no symlinks")
+    def test_writes_through_symlink(self) -> None:
+        with open(self.path("real.txt"), 'w') as f:
+            f.write("old\n")
+        os.symlink(self.path("real.txt"), self.path("link.txt"))
+        self.saver.save(self.path("link.txt"), [["new"]])
+        self.assertTrue(os.path.islink(self.path("link.txt")))
+        with open(self.path("real.txt")) as f:
+            self.assertEqual(f.read(), "new\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+
+from model.mapped_file import MappedFile, split_lines
+
+
+class MappedFileTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "file.txt")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write(self, data: bytes, mode: str = 'wb') -> None:
+        with open(self.filename, mode) as f:
+            f.write(data)
+
+    def test_same_lines_as_whole_file(self) -> None:
+        data = b"crlf\r\nlone\rcr\n\xffbad\n\nlast"
+        self.write(data)
+        source = MappedFile(self.filename)
+        self.assertEqual(source.get_lines(0, source.get_line_count()), split_lines(data))
+
+    def test_grow_closes_old_map(self) -> None:
+        self.write(b"one\n")
+        source = MappedFile(self.filename)
+        old = source._mm
+        self.write(b"two\n", 'ab')
+        source.grow()
+        self.assertTrue(old.closed)
+        self.assertEqual(source.get_lines(0, source.get_line_count()), ["one", "two"])
+
+
+if __name__ == '__main__':
+    unittest.main()
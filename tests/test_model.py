@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+from model.line_rope import LineRope
+from model.model import Model
+
+
+class ReplaceTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.model = Model(LineRope(["abc", "def"]))
+
+    def tearDown(self) -> None:
+        self.model.close()
+
+    def test_replace_count(self) -> None:
+        self.model.set_cursor_pos(1, 0)
+        self.model.replace("x", 2)
+        self.assertEqual(self.model.get_lines(0, 2), ["axx", "def"])
+        self.assertTrue(self.model.get_modify())
+
+    def test_replace_past_end_of_line(self) -> None:
+        # Как в vim: если до конца строки меньше count символов, строка не меняется
+        self.model.set_cursor_pos(1, 0)
+        self.model.replace("x", 3)
+        self.assertEqual(self.model.get_lines(0, 2), ["abc", "def"])
+        self.assertFalse(self.model.get_modify())
+
+
+class FollowTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "app.log")
+        with open(self.filename, 'w') as f:
+            f.write("".join(f"line {i}\n" for i in range(20)))
+        self.model = Model()
+        self.model.load_file(self.filename)
+
+    def tearDown(self) -> None:
+        self.model.close()
+        self.directory.cleanup()
+
+    def test_follow_refuses_modified_buffer(self) -> None:
+        self.model.insert_text("edit ")
+        with self.assertRaises(RuntimeError):
+            self.model.follow(5)
+        self.assertFalse(self.model.is_following())
+        self.assertEqual(self.model.get_len(), 20)
+        self.assertEqual(self.model.get_line(0), "edit line 0")
+
+    def test_recover_after_trim(self) -> None:
+        self.model.follow(5)
+        trimmed = 20 - self.model.get_len()
+        self.model.set_cursor_pos(0, 0)
+        self.model.insert_text("edit ")
+        self.model._flusher.flush()  # Сеанс "упал": журнал остался на диске
+        recovered = Model()
+        try:
+            recovered.load_file(self.filename)
+            self.assertTrue(recovered.has_swap())
+            recovered.recover()
+            self.assertEqual(recovered.get_line(0), "line 0")
+            self.assertEqual(recovered.get_line(trimmed), f"edit line {trimmed}")
+        finally:
+            recovered.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from model.swap_file import HEADER, MAGIC, OWNER, SwapJournal, file_stamp, swap_path
+
+
+class SwapOwnerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "file.txt")
+        with open(self.filename, 'w') as f:
+            f.write("text\n")
+        self.swap = swap_path(self.filename)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write_swap(self, pid: int) -> bytes:
+        data = MAGIC + HEADER.pack(*file_stamp(self.filename), 0) + OWNER.pack(pid, socket.gethostname().encode())
+        with open(self.swap, 'wb') as f:
+            f.write(data)
+        return data
+
+    def test_live_owner_is_left_alone(self) -> None:
+        data = self.write_swap(os.getppid())
+        journal = SwapJournal(self.filename, file_stamp(self.filename))
+        self.assertIsNotNone(journal.owner)
+        self.assertIsNone(journal.stale)
+        journal.record(0, 0, 0, 0, "x")
+        journal.flush()
+        journal.reset(file_stamp(self.filename))
+        with open(self.swap, 'rb') as f:
+            self.assertEqual(f.read(), data)
+        self.assertFalse(os.path.exists(self.swap + ".bak"))
+
+    def test_crashed_owner_is_stale(self) -> None:
+        process = subprocess.Popen([sys.executable, "-c", "pass"])
+        process.wait()
+        self.write_swap(process.pid)
+        journal = SwapJournal(self.filename, file_stamp(self.filename))
+        self.assertIsNone(journal.owner)
+        self.assertEqual(journal.stale, self.swap)
+        journal.record(0, 0, 0, 0, "x")
+        self.assertTrue(os.path.exists(self.swap + ".bak"))
+        journal.discard()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,21 @@
+import unittest
+
+from syntax import LEXERS, lexer_for
+
+
+class LexerForTest(unittest.TestCase):
+    def test_python_file_with_log_in_name(self) -> None:
+        self.assertIs(lexer_for("catalog.py"), LEXERS["python"])
+        self.assertIs(lexer_for("/var/log/login.py"), LEXERS["python"])
+
+    def test_log_suffix(self) -> None:
+        self.assertIs(lexer_for("server.log"), LEXERS["log"])
+        self.assertIs(lexer_for("server.log.1"), LEXERS["log"])
+
+    def test_log_only_inside_name(self) -> None:
+        self.assertIsNone(lexer_for("blog.txt"))
+        self.assertIsNone(lexer_for("changelog.md"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,21 @@
 from abc import ABC, abstractmethod
-from typing import Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional
 
 from controller.controller import IController
 # from controller import IController
 from curses_adapter import CursesAdapter
 from model.model import Observer, IModel
+from model.damage import Damage
+from model.search_index import compile_pattern
+from syntax import Highlighter
+from wrap_index import WrapIndex
 from interfaces.event_listener import EventListener
 from interfaces.IViewAdapter import IViewAdapter
+from profiler import PROFILER
+
+MATCH_CACHE_SIZE = 4096
+
+Marks = Tuple[Tuple[int, int, str], ...]  # Участки строки экрана (начало, конец, стиль)
 
 
 class IView(ABC):
@@ -22,127 +31,275 @@ class CursesView(IView, EventListener):
         rows, cols = self.adapter.get_screen_size()
         self._screen_width = cols
         self._screen_height = rows
-        self._virtual_offset_y = 0  # Смещение по вертикали
-        self._line_wrap_cache = {}  # Кэш переносов строк
+        # Верх экрана: реальная строка и номер ее переноса
+        self._top_line = 0
+        self._top_wrap = 0
+        self._wrap_index = WrapIndex(cols)  # Индекс переносов строк
+        self._frame = [""] * rows  # Текст, который сейчас выведен в каждой строке экрана
+        self._marks: List[Marks] = [()] * rows  # Подсвеченные участки каждой строки экрана
+        self._pattern = ""  # Подсвечиваемый образец поиска
+        self._matches: Dict[str, List[Tuple[int, int]]] = {}  # Совпадения по тексту строки
+        self._selection: Optional[Tuple[int, int, int, int, bool]] = None  # Выделение визуального режима
+        self._highlighter = Highlighter()  # Подсветка синтаксиса по типу файла
 
     def update(self, model: IModel, event_type: str, data: Any) -> None:
         rows, cols = self.adapter.get_screen_size()
-        self._screen_width = cols
-        self._screen_height = rows
-        self._calculate_wrap_cache(model)
-        self._handle_scroll(model)
-        self._draw_ui(model)
-        if event_type == "text_changed":
-            rows, cols = self.adapter.get_screen_size()
+        full = (rows, cols) != (self._screen_height, self._screen_width)
+        if full:
             self._screen_width = cols
             self._screen_height = rows
+            self._wrap_index.set_width(cols)
+            self._clamp_top()
+            self._frame = [""] * rows
+            self._marks = [()] * rows
+            self.adapter.clear_screen()
+
+        old_top = (self._top_line, self._top_wrap)
+        shifted = False
+        full = self._highlighter.set_file(model.get_filename()) or full
+        if event_type == "text_changed" and isinstance(data, Damage) and \
+                self._wrap_index.line_count() + data.delta == model.get_len():
+            shifted = self._apply_damage(model, data)
+            self._highlighter.invalidate(data)
+        elif event_type == "text_changed" or self._wrap_index.line_count() != model.get_len():
             self._calculate_wrap_cache(model)
+            self._highlighter.reset()
+            full = True
+
+        pattern = model.get_search_pattern()
+        if pattern != self._pattern:
+            self._pattern = pattern
+            self._matches = {}
+            full = True
+        selection = model.get_selection()
+        if selection != self._selection:
+            self._selection = selection
+            full = True
+
+        self._handle_scroll(model)
+        while self._sync_visible(model):
             self._handle_scroll(model)
+            full = True
+        full = full or old_top != (self._top_line, self._top_wrap)
+
+        if full:
+            self._draw_ui(model)
+        elif event_type == "text_changed":
+            # Правка могла открыть или закрыть многострочную конструкцию - тогда меняется подсветка ниже
+            shifted = shifted or self._highlighter.spills(model, data.stop)
+            self._draw_damage(model, data, shifted)
+        elif event_type not in ("cursor_moved", "status_changed"):
             self._draw_ui(model)
-        elif event_type == "cursor_moved":
-            self.draw_cursor(model)
+
+        self._draw_status_bar(model)
+        self.draw_cursor(model)
+        self.adapter.noutrefresh()
+        self.adapter.doupdate()
+
     def _calculate_wrap_cache(self, model: IModel):
-        """Рассчитывает кэш переносов строк для всего текста"""
-        lines, (x, y) = model.get_data()
-        self._line_wrap_cache.clear()
-        total_virtual = 0
-
-        for y, line in enumerate(lines):
-            line_len = len(line)
-            wraps = (line_len // self._screen_width) + 1
-            self._line_wrap_cache[y] = {
-                'wraps': wraps,
-                'start_virtual': total_virtual
-            }
-            total_virtual += wraps
-
-    def _real_to_virtual(self, real_x: int, real_y: int) -> Tuple[int, int]:
-        """Преобразует реальные координаты в виртуальные"""
-        if real_y not in self._line_wrap_cache:
-            return (0, 0)
-
-        wrap_info = self._line_wrap_cache[real_y]
-        virtual_y = wrap_info['start_virtual'] + (real_x // self._screen_width)
-        virtual_x = real_x % self._screen_width
-        return (virtual_x, virtual_y)
-
-    def _virtual_to_real(self, virtual_x: int, virtual_y: int) -> Tuple[int, int]:
-        """Преобразует виртуальные координаты в реальные"""
-        for real_y, wrap_info in self._line_wrap_cache.items():
-            if virtual_y < wrap_info['start_virtual'] + wrap_info['wraps']:
-                wrap_offset = virtual_y - wrap_info['start_virtual']
-                real_x = wrap_offset * self._screen_width + virtual_x
-                return (real_x, real_y)
-        return (0, 0)
+        """Полностью перестраивает индекс переносов строк"""
+        self._wrap_index.reset(model.get_line_lengths(0, model.get_len()))
+        self._clamp_top()
+
+    def _apply_damage(self, model: IModel, damage: Damage) -> bool:
+        """Обновляет индекс переносов для измененных строк; возвращает True, если сдвинулись строки ниже"""
+        index = self._wrap_index
+        old_stop = damage.stop - damage.delta
+        if damage.start == 0 and old_stop == index.line_count() and damage.stop == model.get_len():
+            # Заменен весь текст (например, загружен файл)
+            self._calculate_wrap_cache(model)
+            return True
+        lengths = model.get_line_lengths(damage.start, damage.stop)
+        if damage.delta == 0:
+            shifted = False
+            for y, length in enumerate(lengths, damage.start):
+                old_wraps = index.wraps(y)
+                index.update_line(y, length)
+                shifted = shifted or old_wraps != index.wraps(y)
+        else:
+            shifted = True
+            index.delete_lines(damage.start, old_stop)
+            index.insert_lines(damage.start, lengths)
+
+        # Строки выше экрана изменились - сохраняем позицию верхней строки
+        if damage.start < self._top_line:
+            if old_stop <= self._top_line:
+                self._top_line += damage.delta
+            else:
+                self._top_line, self._top_wrap = damage.start, 0
+        self._clamp_top()
+        return shifted
+
+    def _sync_visible(self, model: IModel) -> bool:
+        """Сверяет длины видимых строк с индексом: для непрочитанных строк файла индекс хранит оценку"""
+        changed = False
+        lines = model.get_lines(self._top_line, self._top_line + self._screen_height - 1)
+        for y, line in enumerate(lines, self._top_line):
+            if len(line) != self._wrap_index.length(y):
+                self._wrap_index.update_line(y, len(line))
+                changed = True
+        if changed:
+            self._clamp_top()
+        return changed
+
+    def _clamp_top(self) -> None:
+        self._top_line = min(self._top_line, self._wrap_index.line_count() - 1)
+        self._top_wrap = min(self._top_wrap, self._wrap_index.wraps(self._top_line) - 1)
+
+    def _screen_row(self, real_x: int, real_y: int) -> int:
+        """Номер строки экрана для реальной позиции (может быть вне экрана)"""
+        return (self._wrap_index.distance(self._top_line, real_y) - self._top_wrap
+                + real_x // self._screen_width)
 
     def draw_cursor(self, model: IModel) -> None:
-        lines, (cursor_x, cursor_y) = model.get_data()
-        virt_cursor_x, virt_cursor_y = self._real_to_virtual(cursor_x, cursor_y)
-        start_virtual = self._virtual_offset_y
-        end_virtual = start_virtual + self._screen_height - 2  # -2 для статусной строки
-        if start_virtual <= virt_cursor_y <= end_virtual:
-            visible_cursor_y = virt_cursor_y - start_virtual
-            self.adapter.move_cursor(virt_cursor_x, visible_cursor_y)
-
-    def _draw_ui(self, model: IModel):
-        """Отрисовка с учетом переносов строк"""
-        self.adapter.clear_screen()
-        lines, (cursor_x, cursor_y) = model.get_data()
-
-        # Рассчитываем виртуальную позицию курсора
-        virt_cursor_x, virt_cursor_y = self._real_to_virtual(cursor_x, cursor_y)
-        # print(str(virt_cursor_x) + " " + str(virt_cursor_y))
-        # self.adapter.move_cursor(virt_cursor_y, virt_cursor_x)
-
-        # Определяем видимую область
-        start_virtual = self._virtual_offset_y
-        end_virtual = start_virtual + self._screen_height - 2  # -2 для статусной строки
-
-        # Отрисовываем видимые виртуальные строки
-        row = 0
-        for real_y in self._line_wrap_cache:
-            wrap_info = self._line_wrap_cache[real_y]
-            line = lines[real_y]
-
-            for wrap in range(wrap_info['wraps']):
-                virtual_y = wrap_info['start_virtual'] + wrap
-                if start_virtual <= virtual_y <= end_virtual:
-                    start = wrap * self._screen_width
-                    end = start + self._screen_width
-                    self.adapter.add_str(row, 0, line[start:end])
-                    row += 1
-
-        # Отрисовка курсора
-        self._draw_status_bar(model)
-        if (start_virtual <= virt_cursor_y <= end_virtual and model.get_status() != "command"
-                and (model.get_status() != "find" or model.search)):
-            visible_cursor_y = virt_cursor_y - start_virtual
-            self.adapter.move_cursor(virt_cursor_x, visible_cursor_y)
+        mode = model.get_status()
+        if mode == "command" or (mode == "find" and not model.search):
+            self.adapter.move_cursor(len(self._frame[-1]), self._screen_height - 1)
+            return
+        cursor_x, cursor_y = model.get_cursor_pos()
+        visible_cursor_y = self._screen_row(cursor_x, cursor_y)
+        if 0 <= visible_cursor_y < self._screen_height - 1:  # последняя строка - статусная
+            self.adapter.move_cursor(cursor_x % self._screen_width, visible_cursor_y)
+
+    def _draw_damage(self, model: IModel, damage: Damage, shifted: bool) -> None:
+        """Перерисовывает только строки экрана, затронутые изменением"""
+        first_row = self._screen_row(0, damage.start)
+        if shifted or damage.stop >= self._wrap_index.line_count():
+            last_row = None
+        else:
+            last_row = self._screen_row(0, damage.stop)
+        self._draw_ui(model, first_row, last_row)
+
+    def _draw_ui(self, model: IModel, first_row: int = 0, last_row: Optional[int] = None):
+        """Отрисовка строк экрана [first_row, last_row) с учетом переносов строк"""
+        text_rows = self._screen_height - 1  # последняя строка - статусная
+        last_row = text_rows if last_row is None else min(last_row, text_rows)
+        first_row = max(0, first_row)
+        if first_row >= last_row:
+            return
+        line_count = model.get_len()
 
-        # Статусная строка
-        # self._draw_status_bar(model)
+        # Находим реальную строку, с которой начинается первая перерисовываемая строка экрана
+        real_y, wrap = self._top_line, self._top_wrap
+        for _ in range(first_row):
+            wrap += 1
+            if wrap >= self._wrap_index.wraps(real_y):
+                real_y += 1
+                wrap = 0
+                if real_y >= line_count:
+                    break
+
+        # Запрашиваем у модели только те строки, которые попадут на экран
+        first_line = real_y
+        lines = model.get_lines(first_line, first_line + last_row - first_row)
+        row = first_row
+        while row < last_row:
+            if real_y < line_count:
+                start = wrap * self._screen_width
+                line = lines[real_y - first_line]
+                text = line[start:start + self._screen_width]
+                marks = self._row_marks(model, line, real_y, start, start + len(text))
+                wrap += 1
+                if wrap >= self._wrap_index.wraps(real_y):
+                    real_y += 1
+                    wrap = 0
+            else:
+                text, marks = "", ()
+            self._put_row(row, text, marks)
+            row += 1
+
+    def _line_matches(self, line: str) -> List[Tuple[int, int]]:
+        """Совпадения образца поиска в строке; кэшируются по тексту строки, поэтому прокрутка и правки
+        других строк повторного поиска не вызывают"""
+        matches = self._matches.get(line)
+        if matches is None:
+            if len(self._matches) >= MATCH_CACHE_SIZE:
+                self._matches = {}
+            matches = [(match.start(), match.end()) for match in compile_pattern(self._pattern).finditer(line)
+                       if match.end() > match.start()]
+            self._matches[line] = matches
+        return matches
+
+    def _selected_span(self, line: str, y: int) -> Optional[Tuple[int, int]]:
+        """Выделенная часть строки y"""
+        if self._selection is None:
+            return None
+        x0, y0, x1, y1, linewise = self._selection
+        if not y0 <= y <= y1:
+            return None
+        if linewise:
+            return 0, len(line)
+        return (x0 if y == y0 else 0), (x1 if y == y1 else len(line))
+
+    def _row_marks(self, model: IModel, line: str, y: int, start: int, stop: int) -> Marks:
+        """Подсвечиваемые участки части строки [start, stop) в координатах строки экрана.
+
+        Участки выводятся по порядку, поэтому поиск и выделение рисуются поверх подсветки синтаксиса.
+        """
+        if start >= stop:
+            return ()
+        spans = list(self._highlighter.tokens(model, line, y))
+        if self._pattern:
+            spans.extend((begin, end, 'search') for begin, end in self._line_matches(line))
+        selected = self._selected_span(line, y)
+        if selected is not None:
+            spans.append(selected + ('selection',))
+        return tuple((max(begin, start) - start, min(end, stop) - start, style)
+                     for begin, end, style in spans if begin < stop and end > start)
+
+    def _put_row(self, row: int, text: str, marks: Marks = ()) -> None:
+        """Выводит строку экрана, только если она отличается от уже выведенной"""
+        if self._frame[row] == text and self._marks[row] == marks:
+            return
+        self.adapter.clear_line(row)
+        if text:
+            self.adapter.add_str(row, 0, text)
+        for begin, end, style in marks:
+            self.adapter.add_str(row, begin, text[begin:end], style)
+        self._frame[row] = text
+        self._marks[row] = marks
 
     def _handle_scroll(self, model: IModel):
         """Автоматическая прокрутка при выходе за границы"""
-        _, virt_cursor_y = self._real_to_virtual(model.get_cursor_pos()[0], model.get_cursor_pos()[1])
+        cursor_x, cursor_y = model.get_cursor_pos()
+        cursor_y = min(cursor_y, self._wrap_index.line_count() - 1)
+        text_rows = self._screen_height - 1
+        row = self._screen_row(cursor_x, cursor_y)
 
-        if virt_cursor_y < self._virtual_offset_y:
-            self._virtual_offset_y = virt_cursor_y
-        elif virt_cursor_y >= self._virtual_offset_y + self._screen_height - 1:
-            self._virtual_offset_y = virt_cursor_y - self._screen_height + 2
+        if row < 0:
+            self._top_line = cursor_y
+            self._top_wrap = min(cursor_x // self._screen_width, self._wrap_index.wraps(cursor_y) - 1)
+        elif row >= text_rows:
+            # Поднимаемся от курсора на text_rows - 1 экранных строк
+            line = cursor_y
+            wrap = min(cursor_x // self._screen_width, self._wrap_index.wraps(cursor_y) - 1)
+            left = text_rows - 1
+            while left > wrap and line > 0:
+                left -= wrap + 1
+                line -= 1
+                wrap = self._wrap_index.wraps(line) - 1
+            self._top_line = line
+            self._top_wrap = max(0, wrap - left)
 
     def _draw_status_bar(self, model: IModel):
         """Статусная строка с информацией"""
         mode = model.get_status()
-        if mode == "command":
+        if mode == "command" and model.get_notice():
+            # Итог фоновой операции (например, ошибка записи после :w) пришел, пока строка команды еще видна
+            status = model.get_notice()
+        elif mode == "command":
             status = f":{model.get_command_buf()}"
         elif mode == "find":
             status = f"{model.get_command_buf()}"
         else:
             real_x, real_y = model.get_cursor_pos()
-            status = f"{mode} | Line: {real_y + 1} Col: {real_x + 1}"
+            status = f"{mode} | Line: {real_y + 1}/{model.get_len()} Col: {real_x + 1}"
+            if model.is_following():
+                status += " | follow"
+            if model.get_notice():
+                status += f" | {model.get_notice()}"
 
-        self.adapter.add_str(self._screen_height - 1, 0, status)
+        self._put_row(self._screen_height - 1, status[:self._screen_width - 1])
 
     # def run(self) -> None:
     #     self._draw_ui()
@@ -150,4 +307,10 @@ class CursesView(IView, EventListener):
     #         self.controller.handle_input()
 
     def __del__(self) -> None:
-        self.adapter.end_curses()
\ No newline at end of file
+        self.adapter.end_curses()
+
+
+for _method in ("_calculate_wrap_cache", "_apply_damage", "_sync_visible"):
+    PROFILER.phase(CursesView, _method, "wrap")
+for _method in ("_draw_ui", "_draw_damage", "_draw_status_bar", "draw_cursor"):
+    PROFILER.phase(CursesView, _method, "draw")
@@ -0,0 +1,153 @@
+from array import array
+from typing import Iterable, List, Sequence, Tuple
+
+from model.fenwick import FenwickTree
+
+BLOCK_SIZE = 128
+
+
+class WrapIndex:
+    """Индекс переносов строк: длины строк хранятся блоками, число экранных строк блока - в дереве Фенвика.
+
+    Изменение одной строки - O(log n), расстояние между строками на экране - O(log n + BLOCK_SIZE).
+    После сброса и смены ширины блоки пересчитываются лениво, только когда запрос их затрагивает.
+    """
+
+    def __init__(self, width: int) -> None:
+        self._width = max(1, width)
+        self._blocks: List[array] = [array('q', [0])]
+        self._stamps: List[int] = [self._width]
+        self._stale = 0
+        self._counts = FenwickTree([1])
+        self._wraps = FenwickTree([1])
+
+    def reset(self, lengths: Iterable[int]) -> None:
+        lengths = array('q', lengths) or array('q', [0])
+        self._blocks = [lengths[i:i + BLOCK_SIZE] for i in range(0, len(lengths), BLOCK_SIZE)]
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        # Число экранных строк блока считается при первом обращении к нему, как после смены ширины
+        self._stamps = [0] * len(self._blocks)
+        self._stale = len(self._blocks)
+        self._counts = FenwickTree(len(block) for block in self._blocks)
+        self._wraps = FenwickTree([0] * len(self._blocks))
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    def set_width(self, width: int) -> None:
+        """Меняет ширину экрана; блоки будут пересчитаны при первом обращении"""
+        width = max(1, width)
+        if width == self._width:
+            return
+        self._width = width
+        self._stale = sum(1 for stamp in self._stamps if stamp != width)
+
+    def _replace_blocks(self, first: int, last: int, blocks: List[array]) -> None:
+        """Заменяет блоки [first, last) новыми, перестраивая деревья по суммам блоков за O(число блоков)"""
+        width = self._width
+        counts = [self._counts.get(i) for i in range(len(self._blocks))]
+        wraps = [self._wraps.get(i) for i in range(len(self._blocks))]
+        self._stale -= sum(1 for stamp in self._stamps[first:last] if stamp != width)
+        counts[first:last] = [len(block) for block in blocks]
+        wraps[first:last] = [sum(length // width + 1 for length in block) for block in blocks]
+        self._stamps[first:last] = [width] * len(blocks)
+        self._blocks[first:last] = blocks
+        self._counts = FenwickTree(counts)
+        self._wraps = FenwickTree(wraps)
+
+    def _changed(self, block: int, delta: int) -> None:
+        if self._stamps[block] == self._width:
+            self._wraps.add(block, delta)
+        else:
+            # Сумма устаревшего блока больше не верна ни для какой ширины
+            self._stamps[block] = 0
+
+    def _refresh(self, block: int) -> None:
+        if self._stamps[block] != self._width:
+            self._wraps.set(block, sum(length // self._width + 1 for length in self._blocks[block]))
+            self._stamps[block] = self._width
+            self._stale -= 1
+
+    def _refresh_range(self, first: int, last: int) -> None:
+        if self._stale:
+            for block in range(first, min(last, len(self._blocks) - 1) + 1):
+                self._refresh(block)
+
+    def _locate(self, y: int) -> Tuple[int, int]:
+        if y >= self._counts.total():
+            return len(self._blocks) - 1, len(self._blocks[-1])
+        return self._counts.find(y)
+
+    def line_count(self) -> int:
+        return self._counts.total()
+
+    def length(self, y: int) -> int:
+        block, offset = self._locate(y)
+        return self._blocks[block][offset]
+
+    def wraps(self, y: int) -> int:
+        return self.length(y) // self._width + 1
+
+    def update_line(self, y: int, length: int) -> None:
+        block, offset = self._locate(y)
+        target = self._blocks[block]
+        old = target[offset]
+        target[offset] = length
+        self._changed(block, length // self._width - old // self._width)
+
+    def insert_lines(self, y: int, lengths: Sequence[int]) -> None:
+        if not lengths:
+            return
+        block, offset = self._locate(y)
+        target = self._blocks[block]
+        target[offset:offset] = array('q', lengths)
+        if len(target) > 2 * BLOCK_SIZE:
+            self._replace_blocks(block, block + 1, [
+                target[i:i + BLOCK_SIZE] for i in range(0, len(target), BLOCK_SIZE)
+            ])
+            return
+        self._counts.add(block, len(lengths))
+        self._changed(block, sum(length // self._width + 1 for length in lengths))
+
+    def delete_lines(self, start: int, stop: int) -> None:
+        stop = min(stop, self.line_count())
+        if start >= stop:
+            return
+        first, offset = self._locate(start)
+        block = first
+        left = stop - start
+        emptied = False
+        while left > 0:
+            target = self._blocks[block]
+            count = min(left, len(target) - offset)
+            removed = target[offset:offset + count]
+            del target[offset:offset + count]
+            self._counts.add(block, -count)
+            self._changed(block, -sum(length // self._width + 1 for length in removed))
+            emptied = emptied or not target
+            left -= count
+            block += 1
+            offset = 0
+        if emptied:
+            kept = [target for target in self._blocks[first:block] if target]
+            if not kept and len(self._blocks) == block - first:
+                kept = [array('q', [0])]
+            self._replace_blocks(first, block, kept)
+
+    def _wraps_before(self, block: int, offset: int) -> int:
+        return sum(length // self._width + 1 for length in self._blocks[block][:offset])
+
+    def distance(self, y0: int, y1: int) -> int:
+        """Число экранных строк от начала строки y0 до начала строки y1"""
+        if y1 < y0:
+            return -self.distance(y1, y0)
+        block0, offset0 = self._locate(y0)
+        block1, offset1 = self._locate(y1)
+        self._refresh_range(block0, block1)
+        if block0 == block1:
+            return sum(length // self._width + 1 for length in self._blocks[block0][offset0:offset1])
+        between = self._wraps.prefix_sum(block1) - self._wraps.prefix_sum(block0)
+        return between - self._wraps_before(block0, offset0) + self._wraps_before(block1, offset1)